@@ -0,0 +1,280 @@
+from __future__ import annotations
+from typing import Generator, Iterable, Iterator, Optional
+from mmap import mmap, ACCESS_READ
+import numpy as np
+from exploratory.basic.nodes import Node, VAL
+from exploratory.basic.trees import Tree
+from exploratory.basic.parsers import Parser, BINARY_MAGIC, BINARY_HEADER
+
+
+class ArrayTree:
+    """
+    Tree stored as preorder arrays rather than as a graph of node objects
+    Node i is identified by its preorder index, and has
+        depth   depths[i]
+        id      ids[codes[i]]
+        value   values[i] (values is None if no node has a value)
+        parent  parents[i] (-1 for nodes adjacent to the head of the tree)
+        subtree indices i ... ends[i] - 1
+    Traversals yield preorder indices (or arrays of them) in the same order that Tree yields nodes
+    """
+
+    def __init__(self, depths : np.ndarray, codes : np.ndarray, ids : list[str], values : Optional[list[VAL]] = None):
+        self.depths : np.ndarray = depths
+        self.codes : np.ndarray = codes
+        self.ids : list[str] = ids
+        self.values : Optional[list[VAL]] = values
+        self.parents : np.ndarray = np.full(len(depths), -1, dtype=np.int64)
+        self.ends : np.ndarray = np.arange(1, len(depths) + 1, dtype=np.int64)
+        self.link()
+
+    def __len__(self) -> int:
+        return len(self.depths)
+
+    def link(self):
+        """
+        Compute parent and subtree end arrays from the depth array, one depth level at a time
+        """
+
+        # Handle empty tree
+        if not len(self.depths): return
+        max_depth = int(self.depths.max())
+
+        # Indices of the nodes at each depth (in preorder)
+        levels = [np.flatnonzero(self.depths == d) for d in range(max_depth + 1)]
+
+        # Parent of each node is the closest preceding node at the previous depth
+        for d in range(1, max_depth + 1):
+            above = levels[d - 1]
+            self.parents[levels[d]] = above[np.searchsorted(above, levels[d]) - 1]
+
+        # Size of each subtree is accumulated from the deepest nodes upwards
+        sizes = np.ones(len(self.depths), dtype=np.int64)
+        for d in range(max_depth, 0, -1):
+            np.add.at(sizes, self.parents[levels[d]], sizes[levels[d]])
+        self.ends = np.arange(len(self.depths), dtype=np.int64) + sizes
+
+    def dfs(self) -> Iterator[tuple[int, int]]:
+        """
+        Depth first search tree, yielding depth and node index at each step
+        """
+        return zip(self.depths.tolist(), range(len(self.depths)))
+
+    @property
+    def leaves(self) -> np.ndarray:
+        """
+        Preorder indices of each leaf node
+        """
+        return np.flatnonzero(self.ends == np.arange(1, len(self.depths) + 1))
+
+    def path_matrix(self, leaves : np.ndarray) -> np.ndarray:
+        """
+        Matrix whose ith row is the path from root to the ith leaf, padded with -1
+        """
+
+        # Initialize matrix
+        max_depth = int(self.depths[leaves].max()) if len(leaves) else 0
+        matrix = np.full((len(leaves), max_depth + 1), -1, dtype=np.int64)
+
+        # Walk from every leaf to its root simultaneously
+        rows = np.arange(len(leaves))
+        ancestors = leaves.astype(np.int64)
+        while len(rows):
+            matrix[rows, self.depths[ancestors]] = ancestors
+            ancestors = self.parents[ancestors]
+            active = ancestors >= 0
+            rows, ancestors = rows[active], ancestors[active]
+
+        return matrix
+
+    def complete_path_batches(self, batch_size : int = 4096) -> Generator[tuple[np.ndarray, np.ndarray], None, None]:
+        """
+        Enumerates batches of paths from root to leaf, yielding the leaves of each batch and their path matrix
+        """
+        leaves = self.leaves
+        for start in range(0, len(leaves), batch_size):
+            batch = leaves[start : start + batch_size]
+            yield batch, self.path_matrix(batch)
+
+    @property
+    def complete_paths(self) -> Generator[np.ndarray, None, None]:
+        """
+        Enumerates each path from root to leaf in tree
+        """
+        for leaves, matrix in self.complete_path_batches():
+            for leaf, row in zip(leaves.tolist(), matrix):
+                yield row[: self.depths[leaf] + 1]
+
+    @property
+    def paths(self) -> Generator[np.ndarray, None, None]:
+        """
+        Enumerates each path from root to leaf or repeated node in tree, as an array of preorder indices
+        Paths are split on repeated ids exactly as in Tree.paths, in one pass over the depth, end and id code arrays:
+        the split path is kept as ranges of the path from root, with the position of each id on it,
+        so each repeated id is found and cut out without rescanning the path
+        (the cuts depend on the cuts above them, so they are found in preorder rather than in batches)
+        """
+
+        # Get arrays as lists, which are faster to index one element at a time
+        depths, ends, codes = self.depths.tolist(), self.ends.tolist(), self.codes.tolist()
+
+        # Initialize path from root, and action to undo on backtrack from each of its nodes
+        path : list[int] = list()
+        undo : list = list()
+
+        # Initialize split path as ranges [start, end) of path, where the last range is open and ends at the current node
+        ranges : list[tuple[int, int]] = [(0, -1)]
+
+        # Initialize mapping of the code of each id on split path to the position in path of its instance
+        on_path : dict[int, int] = dict()
+
+        # Initialize paths ending at each split node above the current node
+        splits : list[np.ndarray] = list()
+
+        # DFS
+        for i, depth in enumerate(depths):
+
+            # Backtrack path to proper depth
+            while len(path) > depth:
+                path.pop()
+                action = undo.pop()
+
+                # Restore split path from before split node
+                if type(action) is tuple:
+                    ranges, removed = action
+                    on_path.update(removed)
+                    splits.pop()
+
+                # Remove code of node from split path
+                elif action is not None:
+                    del on_path[action]
+
+            # Add node to path
+            pos = len(path)
+            path.append(i)
+            code = codes[i]
+
+            # Node is leaf
+            if ends[i] == i + 1:
+
+                # Yield the path ending at each split node above leaf, then the split path ending at leaf
+                yield from splits
+                yield self.split_array(path, ranges, pos + 1)
+                undo.append(None)
+
+            # First instance of id
+            elif code not in on_path:
+                on_path[code] = pos
+                undo.append(code)
+
+            # Second instance of id, node is not leaf
+            else:
+
+                # Path ending at node
+                splits.append(self.split_array(path, ranges, pos + 1))
+
+                # Find range containing first instance of id
+                first = on_path[code]
+                k = len(ranges) - 1
+                while ranges[k][0] > first: k -= 1
+
+                # Remove codes after first instance from split path
+                removed : dict[int, int] = dict()
+                for start, end in ranges[k:]:
+                    for j in range(max(start, first + 1), end if end >= 0 else pos):
+                        removed[codes[path[j]]] = j
+                        del on_path[codes[path[j]]]
+                undo.append((ranges, removed))
+
+                # Continue split path from first instance of id
+                ranges = ranges[:k] + [(ranges[k][0], first + 1), (pos + 1, -1)]
+
+    @staticmethod
+    def split_array(path : list[int], ranges : list[tuple[int, int]], end : int) -> np.ndarray:
+        """
+        Array of the preorder indices on a split path, whose last range is closed at end
+        """
+        if len(ranges) == 1: return np.array(path[ranges[0][0] : end], dtype=np.int64)
+        return np.array([i for start, stop in ranges[:-1] + [(ranges[-1][0], end)] for i in path[start : stop]], dtype=np.int64)
+
+    def path_ids(self, path : Iterable[int]) -> list[str]:
+        """
+        Ids of each node in a path
+        """
+        return [self.ids[code] for code in self.codes[path].tolist()]
+
+    @classmethod
+    def from_tree(cls, tree : Tree) -> ArrayTree:
+        """
+        Initialize array tree from tree
+        """
+
+        # Initialize preorder lists and mapping of ids to codes
+        depths : list[int] = list()
+        codes : list[int] = list()
+        values : list[VAL] = list()
+        id_codes : dict[str, int] = dict()
+
+        # Add each node in traversal
+        for depth, node in tree.dfs():
+            code = id_codes.get(node.id)
+            if code is None: code = id_codes[node.id] = len(id_codes)
+            depths.append(depth)
+            codes.append(code)
+            values.append(node.value)
+
+        # Values are omitted if no node has a value
+        if all(value is None for value in values): values = None
+
+        return cls(np.array(depths, dtype=np.uint32), np.array(codes, dtype=np.uint32), list(id_codes), values)
+
+    @classmethod
+    def from_binary(cls, filepath : str, value_cls : type = str) -> ArrayTree:
+        """
+        Initialize array tree from binary file (see parsers.py), memory-mapping its depth and id code arrays
+        """
+
+        # Memory-map file, which stays mapped while the arrays refer to it after the file is closed
+        with open(filepath, 'rb') as f:
+            mm = mmap(f.fileno(), 0, access=ACCESS_READ)
+
+        # Read header
+        magic, n_nodes, n_ids, n_values = BINARY_HEADER.unpack_from(mm)
+        if magic != BINARY_MAGIC:
+            mm.close()
+            raise ValueError("{} is not a binary tree file".format(filepath))
+        offset = BINARY_HEADER.size
+
+        # Map arrays, with the types they are written with (see write_binary)
+        depths = np.frombuffer(mm, dtype=np.uint32, count=n_nodes, offset=offset)
+        offset += 4 * n_nodes
+        codes = np.frombuffer(mm, dtype=np.uint32, count=n_nodes, offset=offset)
+        offset += 4 * n_nodes
+        value_codes = None
+        if n_values:
+            value_codes = np.frombuffer(mm, dtype=np.int32, count=n_nodes, offset=offset)
+            offset += 4 * n_nodes
+
+        # Read string tables
+        tables = list()
+        for n in (n_ids, n_values):
+            offsets = np.frombuffer(mm, dtype=np.uint32, count=n + 1, offset=offset).tolist()
+            offset += 4 * (n + 1)
+            tables.append([mm[offset + offsets[i] : offset + offsets[i + 1]].decode() for i in range(n)])
+            offset += offsets[n]
+        ids, value_strs = tables
+
+        # Parse values exactly as the binary parser does
+        values = None
+        if value_codes is not None:
+            values = [Parser.parse_value(value_strs[code], value_cls) if code >= 0 else None for code in value_codes.tolist()]
+
+        return cls(depths, codes, ids, values)
+
+    def to_tree(self, node_cls : type = Node) -> Tree:
+        """
+        Convert array tree to tree
+        """
+        values = self.values if self.values is not None else [None] * len(self)
+        codes = self.codes.tolist()
+        return Tree.from_parser((depth, node_cls(self.ids[codes[i]], values[i])) for depth, i in self.dfs())
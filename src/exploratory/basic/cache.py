@@ -0,0 +1,105 @@
+from __future__ import annotations
+from typing import Callable, Optional
+from collections import OrderedDict
+from hashlib import sha256
+import os
+from exploratory.tools.files import get_file_hash
+
+
+class TreeCache:
+    """
+    Content-addressed on-disk cache of parsed trees
+    Each entry is a tree in the binary format (see parsers.py), keyed by the hash of the parsed file's content,
+    the kind of parser and the version of the compiler producing the parse tree (if any)
+    Entries are evicted in least recently used order once their total size exceeds max_bytes
+    """
+
+    def __init__(self, rootdir : str, max_bytes : int = 1 << 30):
+        self.rootdir : str = rootdir
+        self.max_bytes : int = max_bytes
+        self.hits : int = 0
+        self.misses : int = 0
+        self.evictions : int = 0
+
+        # Mapping of each key to the size of its entry, from least to most recently used
+        self.entries : OrderedDict[str, int] = OrderedDict()
+        self.size : int = 0
+
+        # Index existing entries by their last use
+        os.makedirs(rootdir, exist_ok=True)
+        existing = list()
+        for entry in os.scandir(rootdir):
+            if entry.name.endswith(".bin"):
+                stat = entry.stat()
+                existing.append((stat.st_mtime, entry.name[:-len(".bin")], stat.st_size))
+        for _, key, size in sorted(existing):
+            self.entries[key] = size
+            self.size += size
+        self.evict()
+
+    def key(self, filepath : str, parser : str, version : str = "") -> str:
+        """
+        Key of the entry for the tree parsed from filepath by parser
+        """
+        return sha256("\0".join((get_file_hash(filepath), parser, version)).encode()).hexdigest()
+
+    def path(self, key : str) -> str:
+        return os.path.join(self.rootdir, key + ".bin")
+
+    def lookup(self, key : str) -> Optional[str]:
+        """
+        Get the filepath of the entry for key, marking it as most recently used, or None if there is no entry
+        """
+
+        # Entry does not exist
+        if key not in self.entries:
+            self.misses += 1
+            return None
+
+        # Entry was removed from disk, drop it so evictions see the true size
+        if not os.path.exists(self.path(key)):
+            self.size -= self.entries.pop(key)
+            self.misses += 1
+            return None
+
+        # Mark entry as most recently used
+        self.hits += 1
+        self.entries.move_to_end(key)
+        os.utime(self.path(key))
+        return self.path(key)
+
+    def store(self, key : str, write : Callable[[str], None]):
+        """
+        Create the entry for key by calling write with its filepath, then evict entries until the cache fits in max_bytes
+        """
+
+        # Write entry to a temporary file and move it into place, so readers never see a partial entry
+        temp = self.path(key) + ".{}.tmp".format(os.getpid())
+        write(temp)
+        os.replace(temp, self.path(key))
+
+        # Add entry
+        self.size -= self.entries.pop(key, 0)
+        self.entries[key] = os.path.getsize(self.path(key))
+        self.size += self.entries[key]
+        self.evict()
+
+    def evict(self):
+        """
+        Remove least recently used entries until the cache fits in max_bytes (never removing the most recent entry)
+        """
+        while self.size > self.max_bytes and len(self.entries) > 1:
+            old, size = self.entries.popitem(last=False)
+            if os.path.exists(self.path(old)): os.remove(self.path(old))
+            self.size -= size
+            self.evictions += 1
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits" : self.hits,
+            "misses" : self.misses,
+            "evictions" : self.evictions,
+            "entries" : len(self.entries),
+            "bytes" : self.size,
+        }
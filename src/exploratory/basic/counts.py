@@ -0,0 +1,103 @@
+from __future__ import annotations
+from typing import Iterable, Iterator, Mapping, Optional, Union
+from collections.abc import MutableMapping
+from array import array
+from bisect import bisect_left
+
+
+# Each entry packs a tree id into the high bits and its count into the low bits of one unsigned 64-bit integer
+COUNT_BITS = 32
+COUNT_MASK = (1 << COUNT_BITS) - 1
+
+
+class SparseCounts(MutableMapping):
+    """
+    Compact mapping of tree id to count, used in place of a Counter as the value of structure nodes
+    Stores each (tree id, count) pair as one packed integer in an array sorted by tree id,
+    rather than as a hash table of int objects
+    Behaves like a Counter for the operations used by structures:
+    missing tree ids count as 0, '+=' increments a count, and update adds counts
+    Appending tree ids in increasing order (as ingestion does) takes constant time
+    Tree ids and counts must be less than 2 ** 32
+    """
+
+    __slots__ = ("entries",)
+
+    def __init__(self, counts : Union[Mapping[int, int], Iterable[tuple[int, int]], None] = None):
+        self.entries : array = array('Q')
+        if counts is not None: self.update(counts)
+
+    def find(self, tree_id : int) -> int:
+        """
+        Index of the entry of tree_id, or -1 if it has no count
+        """
+        i = bisect_left(self.entries, tree_id << COUNT_BITS)
+        return i if i < len(self.entries) and self.entries[i] >> COUNT_BITS == tree_id else -1
+
+    def __getitem__(self, tree_id : int) -> int:
+
+        # Get count of last tree id, which ingestion increments repeatedly
+        if self.entries and self.entries[-1] >> COUNT_BITS == tree_id: return self.entries[-1] & COUNT_MASK
+        i = self.find(tree_id)
+        return self.entries[i] & COUNT_MASK if i >= 0 else 0
+
+    def get(self, tree_id : int, default : Optional[int] = None) -> Optional[int]:
+        i = self.find(tree_id)
+        return self.entries[i] & COUNT_MASK if i >= 0 else default
+
+    def __setitem__(self, tree_id : int, count : int):
+        if count > COUNT_MASK: raise OverflowError("count {} of tree {} does not fit in {} bits".format(count, tree_id, COUNT_BITS))
+        entry = (tree_id << COUNT_BITS) | count
+
+        # Append tree id greater than all others, or set count of last tree id
+        last = self.entries[-1] >> COUNT_BITS if self.entries else -1
+        if tree_id > last:
+            self.entries.append(entry)
+            return
+        if tree_id == last:
+            self.entries[-1] = entry
+            return
+
+        # Set count of existing tree id, or insert new tree id in sorted position
+        i = bisect_left(self.entries, tree_id << COUNT_BITS)
+        if self.entries[i] >> COUNT_BITS == tree_id:
+            self.entries[i] = entry
+        else:
+            self.entries.insert(i, entry)
+
+    def __delitem__(self, tree_id : int):
+        i = self.find(tree_id)
+        if i < 0: raise KeyError(tree_id)
+        del self.entries[i]
+
+    def __contains__(self, tree_id : int) -> bool:
+        return self.find(tree_id) >= 0
+
+    def __iter__(self) -> Iterator[int]:
+        return (entry >> COUNT_BITS for entry in self.entries)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __repr__(self) -> str:
+        return "SparseCounts({})".format(dict(self.items()))
+
+    def keys(self) -> Iterator[int]:
+        return (entry >> COUNT_BITS for entry in self.entries)
+
+    def values(self) -> Iterator[int]:
+        return (entry & COUNT_MASK for entry in self.entries)
+
+    def items(self) -> Iterator[tuple[int, int]]:
+        return ((entry >> COUNT_BITS, entry & COUNT_MASK) for entry in self.entries)
+
+    def update(self, other : Union[Mapping[int, int], Iterable[tuple[int, int]]] = ()):
+        """
+        Add counts of other to counts (as Counter.update does)
+        """
+        pairs = other.items() if isinstance(other, Mapping) else other
+        for tree_id, count in pairs:
+            self[tree_id] += count
+
+    def total(self) -> int:
+        return sum(entry & COUNT_MASK for entry in self.entries)
@@ -0,0 +1,60 @@
+from __future__ import annotations
+from typing import Iterable, Optional
+from concurrent.futures import ProcessPoolExecutor
+from exploratory.basic.trees import Tree
+from exploratory.basic.structures import TreeStructure
+
+
+def get_structure_nodes(filepath : str) -> list[tuple[int, str, int]]:
+    """
+    Parse a tree from file and get the structure of its paths (see TreeStructure.add_tree),
+    as the preorder list of the (depth, id, count) of each node, with the children of each node in the order they were created
+    Adding the nodes to a structure in that order creates the same nodes as TreeStructure.add_tree,
+    and each node is found from its parent, so shared path prefixes are only walked once
+    """
+
+    # Build structure of tree
+    structure = TreeStructure()
+    structure.insert_tree(Tree.from_file(filepath), 0)
+
+    # Get nodes of structure in preorder
+    nodes : list[tuple[int, str, int]] = list()
+    # (adj_gen yields the children of each node from the last created, so the first created is visited first)
+    stack = [(0, adj) for adj in structure.adj_gen]
+    while stack:
+        depth, node = stack.pop()
+        nodes.append((depth, node.id, node.value[0]))
+        stack.extend((depth + 1, adj) for adj in node.adj_gen)
+
+    return nodes
+
+
+def ingest(filepaths : Iterable[str], structure : Optional[TreeStructure] = None, n_workers : Optional[int] = None, chunksize : int = 8) -> TreeStructure:
+    """
+    Add the tree in each file to a structure, parsing and splitting trees into paths in a pool of worker processes
+    Each worker returns the structure nodes of its trees, which are merged into the structure in the order of filepaths,
+    so each tree gets the same id as it would by calling add_tree on each file in turn
+    Uses the calling process only if n_workers is 1
+    """
+
+    # Initialize structure
+    if structure is None: structure = TreeStructure()
+
+    # Add structure nodes of each tree to structure in order
+    def merge(all_nodes : Iterable[list[tuple[int, str, int]]]):
+        for nodes in all_nodes:
+            tree_id = structure.n_trees
+            structure.n_trees += 1
+            if structure.symbols is not None: nodes = [(depth, structure.symbols.intern(id), count) for depth, id, count in nodes]
+            structure.add_nodes(nodes, tree_id)
+
+    # Add each tree in calling process, where nothing needs to be passed between processes
+    if n_workers == 1:
+        for filepath in filepaths: structure.add_tree(Tree.from_file(filepath, structure.symbols))
+
+    # Build structure nodes of each tree in worker processes
+    else:
+        with ProcessPoolExecutor(n_workers) as pool:
+            merge(pool.map(get_structure_nodes, filepaths, chunksize=chunksize))
+
+    return structure
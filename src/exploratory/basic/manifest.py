@@ -0,0 +1,126 @@
+from __future__ import annotations
+from typing import Callable, Iterable, Optional
+import json
+import os
+from exploratory.basic.trees import Tree
+from exploratory.basic.structures import TreeStructure
+from exploratory.basic.symbols import SymbolTable
+from exploratory.tools.files import get_file_hash
+
+
+class CorpusManifest:
+    """
+    Mapping of each file ingested into a structure to its modification time, content hash and tree id
+    Used to re-ingest only the files that changed since the structure was last synced,
+    and to resume an interrupted sync from its last checkpoint
+    """
+
+    def __init__(self, entries : Optional[dict[str, dict]] = None):
+        self.entries : dict[str, dict] = entries if entries is not None else dict()
+
+    def sync(self, structure : TreeStructure, filepaths : Iterable[str], load : Optional[Callable[[str], Tree]] = None,
+             checkpoint : Optional[str] = None, checkpoint_every : int = 100) -> dict[str, list[str]]:
+        """
+        Update structure to contain exactly the trees in filepaths
+        1. Trees of files no longer in filepaths are removed
+        2. Trees of changed files are replaced in place, keeping their tree id
+        3. Trees of new files are added
+        Trees are loaded with load, which defaults to Tree.from_file with the symbol table of structure
+        If checkpoint is given, the structure and manifest are written to it every checkpoint_every changes and at the end
+        Returns the lists of added, replaced and removed files
+        """
+
+        # Load trees from text files by default
+        if load is None: load = lambda filepath : Tree.from_file(filepath, structure.symbols)
+
+        # Initialize lists of changes
+        changes : dict[str, list[str]] = {"added" : [], "replaced" : [], "removed" : []}
+        n_changes = 0
+        filepaths = list(filepaths)
+
+        # Remove trees of deleted files
+        for filepath in sorted(set(self.entries) - set(filepaths)):
+            structure.remove_tree(self.entries.pop(filepath)["tree_id"])
+            changes["removed"].append(filepath)
+            n_changes += 1
+
+        # Iterate over each file
+        for filepath in filepaths:
+            entry = self.entries.get(filepath)
+            mtime = os.path.getmtime(filepath)
+
+            # File is unchanged since it was last synced
+            if entry is not None and entry["mtime"] == mtime: continue
+
+            # File was touched, but its content is unchanged
+            file_hash = get_file_hash(filepath)
+            if entry is not None and entry["hash"] == file_hash:
+                entry["mtime"] = mtime
+                continue
+
+            # File changed, replace its tree
+            if entry is not None:
+                structure.replace_tree(entry["tree_id"], load(filepath))
+                changes["replaced"].append(filepath)
+
+            # File is new, add its tree
+            else:
+                entry = self.entries[filepath] = {"tree_id" : structure.add_tree(load(filepath))}
+                changes["added"].append(filepath)
+
+            # Update entry
+            entry["mtime"] = mtime
+            entry["hash"] = file_hash
+
+            # Write checkpoint
+            n_changes += 1
+            if checkpoint is not None and n_changes % checkpoint_every == 0:
+                self.save_checkpoint(checkpoint, structure)
+
+        # Write final checkpoint
+        if checkpoint is not None:
+            self.save_checkpoint(checkpoint, structure)
+
+        return changes
+
+    def save(self, filepath : str):
+        """
+        Write manifest to file
+        """
+        f = open(filepath, 'w')
+        json.dump(self.entries, f)
+        f.close()
+
+    @classmethod
+    def load(cls, filepath : str) -> CorpusManifest:
+        """
+        Read manifest from file
+        """
+        f = open(filepath, 'r')
+        manifest = cls(json.load(f))
+        f.close()
+        return manifest
+
+    def save_checkpoint(self, filepath : str, structure : TreeStructure):
+        """
+        Write manifest together with the structure it describes (and its symbol table, if any) to file
+        The file is replaced atomically, so the manifest and the structure in a checkpoint are always consistent
+        """
+        temp = "{}.{}.tmp".format(filepath, os.getpid())
+        f = open(temp, 'w')
+        symbols = structure.symbols.ids if structure.symbols is not None else None
+        json.dump({"manifest" : self.entries, "structure" : structure.to_json(), "symbols" : symbols}, f)
+        f.close()
+        os.replace(temp, filepath)
+
+    @classmethod
+    def load_checkpoint(cls, filepath : str) -> tuple[CorpusManifest, TreeStructure]:
+        """
+        Read manifest and structure (with its symbol table, if any) from checkpoint file
+        Calling sync on them resumes the sync that wrote the checkpoint
+        """
+        f = open(filepath, 'r')
+        data = json.load(f)
+        f.close()
+        symbols = SymbolTable(data["symbols"]) if data["symbols"] is not None else None
+        return cls(data["manifest"]), TreeStructure.from_json(data["structure"], symbols)
@@ -1,6 +1,6 @@
 from __future__ import annotations
 from abc import ABC, abstractproperty, abstractmethod
-from typing import Union, Generator, TypeVar
+from typing import Union, Generator, TypeVar, Optional
 
 V = TypeVar("V", int, str, float)
 VAL = V | tuple[V] | list[V] | list[tuple[V]] | None
@@ -8,9 +8,12 @@ VAL = V | tuple[V] | list[V] | list[tuple[V]] | None
 
 class AbstractNode(ABC):
 
-    def __init__(self, id : str, adj : Union[list[AbstractNode], dict[str, AbstractNode]], value : VAL = None):
+    # Subclasses may define slots in place of a per-instance dict
+    __slots__ = ()
+
+    def __init__(self, id : str, adj : Union[list[AbstractNode], dict[str, AbstractNode], None], value : VAL = None):
         self.id : str = id
-        self.adj : Union[list[AbstractNode], dict[str, AbstractNode]] = adj
+        self.adj : Union[list[AbstractNode], dict[str, AbstractNode], None] = adj
         self.value : VAL = value
     
     @abstractproperty
@@ -24,6 +27,10 @@ class AbstractNode(ABC):
     @abstractmethod
     def get_adj(self, id : str) -> AbstractNode:
         pass
+    
+    @abstractmethod
+    def remove_adj(self, node : AbstractNode):
+        pass
         
 
 class Node(AbstractNode):
@@ -43,6 +50,9 @@ class Node(AbstractNode):
         for adj in self.adj_gen:
             if adj.id == id:
                 return adj
+                
+    def remove_adj(self, node : AbstractNode):
+        self.adj.remove(node)
         
 
 class HashNode(AbstractNode):
@@ -59,4 +69,89 @@ class HashNode(AbstractNode):
         self.adj[node.id] = node
         
     def get_adj(self, id : str) -> AbstractNode:
-        return self.adj.get(id)
\ No newline at end of file
+        return self.adj.get(id)
+    
+    def remove_adj(self, node : AbstractNode):
+        if self.adj.get(node.id) is node: del self.adj[node.id]
+
+
+class SlotNode(AbstractNode):
+    """
+    Memory-lean counterpart of Node
+    Has no per-instance dict, only allocates its list of adjacent nodes once a node is added,
+    and indexes adjacent nodes by id once it has more than INDEX_THRESHOLD of them
+    """
+
+    __slots__ = ("id", "adj", "value", "index")
+
+    # Number of adjacent nodes above which adjacent nodes are indexed by id
+    INDEX_THRESHOLD = 16
+
+    def __init__(self, id : str, value : VAL = None):
+        AbstractNode.__init__(self, id, None, value)
+        self.index : Optional[dict[str, AbstractNode]] = None
+
+    @property
+    def adj_gen(self) -> Generator[AbstractNode, None, None]:
+        if self.adj:
+            for c in reversed(self.adj):
+                yield c
+
+    def add_adj(self, node : AbstractNode):
+
+        # Allocate list of adjacent nodes
+        if self.adj is None:
+            self.adj = [node]
+            return
+        self.adj.append(node)
+
+        # Index adjacent nodes by id (later nodes take precedence, as in Node.get_adj)
+        if self.index is not None:
+            self.index[node.id] = node
+        elif len(self.adj) > self.INDEX_THRESHOLD:
+            self.index = {adj.id : adj for adj in self.adj}
+
+    def get_adj(self, id : str) -> AbstractNode:
+        if self.index is not None:
+            return self.index.get(id)
+        for adj in self.adj_gen:
+            if adj.id == id:
+                return adj
+
+    def remove_adj(self, node : AbstractNode):
+        if not self.adj: return
+        self.adj.remove(node)
+
+        # Index the last remaining adjacent node with the same id
+        if self.index is not None and self.index.get(node.id) is node:
+            del self.index[node.id]
+            for adj in self.adj:
+                if adj.id == node.id: self.index[adj.id] = adj
+
+
+class SlotHashNode(AbstractNode):
+    """
+    Memory-lean counterpart of HashNode
+    Has no per-instance dict, and only allocates its dict of adjacent nodes once a node is added
+    """
+
+    __slots__ = ("id", "adj", "value")
+
+    def __init__(self, id : str, value : VAL = None):
+        AbstractNode.__init__(self, id, None, value)
+
+    @property
+    def adj_gen(self) -> Generator[AbstractNode, None, None]:
+        if self.adj:
+            for c in reversed(self.adj.values()):
+                yield c
+
+    def add_adj(self, node : AbstractNode):
+        if self.adj is None: self.adj = dict()
+        self.adj[node.id] = node
+
+    def get_adj(self, id : str) -> AbstractNode:
+        return self.adj.get(id) if self.adj else None
+
+    def remove_adj(self, node : AbstractNode):
+        if self.adj and self.adj.get(node.id) is node: del self.adj[node.id]
@@ -1,9 +1,14 @@
-from typing import Iterable, Type, TypeVar
+from typing import Iterable, Type, TypeVar, Optional
 from abc import ABC, abstractmethod
 from io import StringIO
+from functools import lru_cache
+from array import array
+from mmap import mmap, ACCESS_READ
+import struct
 import re
-from subprocess import check_output
+from subprocess import check_output, Popen, PIPE, CalledProcessError
 from exploratory.basic.nodes import AbstractNode
+from exploratory.basic.symbols import SymbolTable
 
 # Type hinting variables
 N = TypeVar("N", bound=AbstractNode)
@@ -12,11 +17,15 @@ VAL = V | list[V] | None
 
 
 class Parser(Iterable, ABC):
+
+    # Symbol table used to intern the id of each node (ids are left as strings if None)
+    symbols : Optional[SymbolTable] = None
     
     def __init__(self, filepath : str):
         self.filepath = filepath
     
-    def parse_value(self, value_str : str, value_cls : Type[V]) -> VAL:
+    @staticmethod
+    def parse_value(value_str : str, value_cls : Type[V]) -> VAL:
         
         # Value is not None
         if len(value_str) > 0:
@@ -34,7 +43,7 @@ class Parser(Iterable, ABC):
         pass
     
 
-def StandardParser(node_cls : Type[N], value_cls : Type[V]) -> Type[Parser]:
+def StandardParser(node_cls : Type[N], value_cls : Type[V], symbols : Optional[SymbolTable] = None) -> Type[Parser]:
     
     class __StandardParser(Parser):
         
@@ -58,6 +67,7 @@ def StandardParser(node_cls : Type[N], value_cls : Type[V]) -> Type[Parser]:
 
                 # Get id
                 id = res[0]
+                if symbols is not None: id = symbols.intern(id)
                 
                 # Get value
                 value_str = res[1]
@@ -72,10 +82,200 @@ def StandardParser(node_cls : Type[N], value_cls : Type[V]) -> Type[Parser]:
             # Close file
             f.close()
             
+    __StandardParser.symbols = symbols
     return __StandardParser
+
+
+def BulkParser(node_cls : Type[N], value_cls : Type[V], symbols : Optional[SymbolTable] = None, chunk_size : int = 1 << 22) -> Type[Parser]:
+    """
+    Streaming variant of StandardParser
+    Reads the file in large binary chunks instead of loading every line at once,
+    and finds the depth of each line from its run of leading '| ' bytes instead of a regex
+    Yields the same (depth, node) pairs as StandardParser
+    """
+
+    class __BulkParser(Parser):
+
+        def __init__(self, filepath : str):
+            Parser.__init__(self, filepath)
+
+        def __iter__(self) -> tuple[int, N]:
+
+            # Open file
+            f = open(self.filepath, 'rb')
+
+            # Bytes following the last newline of the previous chunk
+            remainder = b""
+
+            # Iterate over each chunk
+            while True:
+                data = f.read(chunk_size)
+
+                # Split off the incomplete last line of the chunk
+                # The last line of the file is complete once the file is exhausted
+                if data:
+                    chunk = remainder + data
+                    cut = chunk.rfind(b"\n") + 1
+                    chunk, remainder = chunk[:cut], chunk[cut:]
+                else:
+                    chunk, remainder = remainder, b""
+
+                # Iterate over each line in chunk
+                for line in chunk.decode().split("\n"):
+
+                    # Strip leading '| ' to get the remainder of the line
+                    stripped = line.lstrip("| ")
+                    if not stripped: continue
+
+                    # Get depth
+                    depth = (len(line) - len(stripped)) >> 1
+
+                    # Get id and value
+                    id, _, value_str = stripped.partition(" ")
+                    if symbols is not None: id = symbols.intern(id)
+                    value = self.parse_value(value_str, value_cls)
+
+                    # Yield tuple
+                    yield depth, node_cls(id, value)
+
+                # Stop once the file is exhausted
+                if not data: break
+
+            # Close file
+            f.close()
+
+    __BulkParser.symbols = symbols
+    return __BulkParser
+
+
+# Binary tree format
+# Header:   BINARY_MAGIC, then the number of nodes, ids and values as unsigned 64 bit integers
+# Arrays:   preorder depths (uint32), preorder id codes (uint32), preorder value codes (int32, -1 for no value)
+#           The value code array is omitted if the tree has no values
+# Tables:   id and value strings, each as an array of n + 1 offsets (uint32) followed by the utf-8 encoded strings
+# Values are stored in their text representation and parsed on load, so loading a binary file
+# produces the same tree as loading the equivalent text file
+BINARY_MAGIC = b"TREEBIN1"
+BINARY_HEADER = struct.Struct("<8sQQQ")
+
+
+def write_binary(filepath : str, depths : Iterable[int], codes : Iterable[int], value_codes : Iterable[int], ids : list[str], values : list[str]):
+    """
+    Write the preorder arrays and string tables of a tree to file in the binary tree format
+    """
+
+    # Convert arrays
+    depths = array('I', depths)
+    codes = array('I', codes)
+    value_codes = array('i', value_codes)
+
+    # Open file
+    f = open(filepath, 'wb')
+
+    # Write header and arrays
+    f.write(BINARY_HEADER.pack(BINARY_MAGIC, len(depths), len(ids), len(values)))
+    f.write(depths.tobytes())
+    f.write(codes.tobytes())
+    if values: f.write(value_codes.tobytes())
+
+    # Write string tables
+    for table in (ids, values):
+        encoded = [s.encode() for s in table]
+        offsets = array('I', [0])
+        for s in encoded: offsets.append(offsets[-1] + len(s))
+        f.write(offsets.tobytes())
+        f.write(b"".join(encoded))
+
+    # Close file
+    f.close()
+
+
+def BinaryParser(node_cls : Type[N], value_cls : Type[V], symbols : Optional[SymbolTable] = None) -> Type[Parser]:
+    """
+    Parser for the binary tree format
+    Memory-maps the file and yields (depth, node) pairs directly from its preorder arrays
+    """
+
+    class __BinaryParser(Parser):
+
+        def __init__(self, filepath : str):
+            Parser.__init__(self, filepath)
+
+        def read_table(self, buffer : memoryview, offset : int, n : int) -> tuple[list[str], int]:
+
+            # Get offsets of each string in table, releasing their view even if a string fails to decode
+            with buffer[offset : offset + 4 * (n + 1)].cast('I') as offsets:
+                start = offset + 4 * (n + 1)
+
+                # Decode each string
+                table = [str(buffer[start + offsets[i] : start + offsets[i + 1]], "utf-8") for i in range(n)]
+                end = start + offsets[n]
+
+            return table, end
+
+        def __iter__(self) -> tuple[int, N]:
+
+            # Memory-map file, closing map and file even if iteration raises or is abandoned
+            with open(self.filepath, 'rb') as f, mmap(f.fileno(), 0, access=ACCESS_READ) as mm:
+
+                # Views of map, which must all be released before map is closed
+                buffer = memoryview(mm)
+                views = [buffer]
+                try:
+
+                    # Read header
+                    magic, n_nodes, n_ids, n_values = BINARY_HEADER.unpack_from(buffer)
+                    if magic != BINARY_MAGIC: raise ValueError("{} is not a binary tree file".format(self.filepath))
+                    offset = BINARY_HEADER.size
+
+                    # Get views of arrays
+                    depths = buffer[offset : offset + 4 * n_nodes].cast('I')
+                    views.append(depths)
+                    offset += 4 * n_nodes
+                    codes = buffer[offset : offset + 4 * n_nodes].cast('I')
+                    views.append(codes)
+                    offset += 4 * n_nodes
+                    value_codes = None
+                    if n_values:
+                        value_codes = buffer[offset : offset + 4 * n_nodes].cast('i')
+                        views.append(value_codes)
+                        offset += 4 * n_nodes
+
+                    # Read string tables
+                    ids, offset = self.read_table(buffer, offset, n_ids)
+                    if symbols is not None: ids = [symbols.intern(id) for id in ids]
+                    values, offset = self.read_table(buffer, offset, n_values)
+
+                    # Yield (depth, node) pair for each node in preorder
+                    for i in range(n_nodes):
+                        value_code = value_codes[i] if value_codes is not None else -1
+                        value = self.parse_value(values[value_code], value_cls) if value_code >= 0 else None
+                        yield depths[i], node_cls(ids[codes[i]], value)
+
+                # Release views, from the last one taken of buffer
+                finally:
+                    for view in reversed(views): view.release()
+
+    __BinaryParser.symbols = symbols
+    return __BinaryParser
+
         
+# Command that dumps the parse tree of the Fortran source file at a given filepath
+FLANG_COMMAND = "flang-new -fc1 -fdebug-dump-parse-tree-no-sema {}"
+
+# Command that outputs the version of flang-new
+FLANG_VERSION_COMMAND = "flang-new --version"
+
+
+@lru_cache
+def get_flang_version(command : str = FLANG_VERSION_COMMAND) -> str:
+    """
+    Get the version string of flang-new (first line of its version output)
+    """
+    return check_output(command, shell=True, text=True).split("\n")[0].strip()
+
         
-def FlangParser(node_cls : Type[N]) -> Type[Parser]:
+def FlangParser(node_cls : Type[N], symbols : Optional[SymbolTable] = None, command : str = FLANG_COMMAND) -> Type[Parser]:
     
     class __FlangParser(Parser):
         
@@ -96,7 +296,7 @@ def FlangParser(node_cls : Type[N]) -> Type[Parser]:
             line_num = 1
             
             # Open file
-            raw_parse_tree = check_output("flang-new -fc1 -fdebug-dump-parse-tree-no-sema {}".format(self.filepath), shell=True, text=True)      
+            raw_parse_tree = check_output(command.format(self.filepath), shell=True, text=True)      
 
             # Iterate over each line of output 
             for line in StringIO(raw_parse_tree).readlines():
@@ -166,6 +366,7 @@ def FlangParser(node_cls : Type[N]) -> Type[Parser]:
                     else:
                         id = kw
                         value = None
+                    if symbols is not None: id = symbols.intern(id)
                     yield depth, node_cls(id, value)
                     
                 # Update vars
@@ -173,4 +374,78 @@ def FlangParser(node_cls : Type[N]) -> Type[Parser]:
 
             return head
         
-    return __FlangParser
\ No newline at end of file
+    __FlangParser.symbols = symbols
+    return __FlangParser
+
+
+def StreamingFlangParser(node_cls : Type[N], symbols : Optional[SymbolTable] = None, command : str = FLANG_COMMAND) -> Type[Parser]:
+    """
+    Streaming variant of FlangParser
+    Reads the parse tree dump line by line from the stdout of the subprocess instead of buffering all of it,
+    and splits each line into its "->" separated keywords and its quoted string with bulk string operations
+    Each keyword is yielded one level deeper than the previous keyword on the same line,
+    and the quoted string is yielded as a 'StrVal' node (or an unquoted value as a node with the value as its id)
+    one level deeper than the last keyword
+    """
+
+    class __StreamingFlangParser(Parser):
+
+        def __init__(self, filepath : str):
+            Parser.__init__(self, filepath)
+
+        def __iter__(self) -> tuple[int, N]:
+
+            # Start subprocess
+            process = Popen(command.format(self.filepath), shell=True, stdout=PIPE, text=True, bufsize=1 << 20)
+            completed = False
+            try:
+                yield from self.parse_lines(process.stdout)
+                completed = True
+
+            # Kill subprocess if iteration raised or was abandoned, then close its output and wait for it
+            finally:
+                if not completed: process.kill()
+                process.stdout.close()
+                process.wait()
+
+            # Subprocess failed
+            if process.returncode != 0:
+                raise CalledProcessError(process.returncode, command.format(self.filepath))
+
+        def parse_lines(self, lines : Iterable[str]) -> tuple[int, N]:
+
+            # Iterate over each line of output as it is produced
+            for line in lines:
+
+                # Strip leading '| ' to get the remainder of the line
+                line = line.rstrip("\n")
+                stripped = line.lstrip("| ")
+                if not stripped: continue
+
+                # Get depth from the number of '|' preceding the remainder of the line
+                depth = line.count("|", 0, len(line) - len(stripped))
+
+                # Split off the quoted string, which extends to the end of the line
+                quote = stripped.find("'")
+                if quote < 0: quote = len(stripped)
+                keywords = stripped[:quote].split("->")
+
+                # Split off the unquoted value of the last keyword (an enumerator, as in 'Intent = In'),
+                # which is yielded one level deeper than the last keyword, as the child FlangParser gives it
+                keywords[-1], _, enumerator = keywords[-1].partition(" = ")
+                keywords = [kw.strip(" =") for kw in keywords]
+                keywords.append(enumerator.strip())
+
+                # Yield (depth, node) pair for each keyword
+                for kw in keywords:
+                    if not kw: continue
+                    yield depth, node_cls(symbols.intern(kw) if symbols is not None else kw, None)
+                    depth += 1
+
+                # Yield (depth, node) pair for the quoted string
+                string = stripped[quote:].rstrip()
+                if len(string) > 1 and string[-1] == "'":
+                    yield depth, node_cls(symbols.intern("StrVal") if symbols is not None else "StrVal", string[1:-1])
+
+    __StreamingFlangParser.symbols = symbols
+    return __StreamingFlangParser
@@ -0,0 +1,130 @@
+from __future__ import annotations
+from abc import ABC, abstractmethod
+from typing import Callable, Optional, Sequence, Union
+import numpy as np
+
+
+"""
+Vectorized activation functions for StructureQueryTool.query
+Each is evaluated on a matrix of counts with one row per queried path and one column per tree
+Expressions evaluate to one number per tree, and comparing an expression gives a predicate
+Predicates evaluate to one boolean per tree, and are combined with &, | and ~
+
+    (Count(0) > 0) & (Count(1) > 0)     trees containing both paths
+    Min() >= 2                          trees containing every path at least twice
+    ~(Max(1, 2) > 0) | (Sum() > 10)     trees containing neither path 1 nor 2, or more than 10 paths in total
+"""
+class Expression(ABC):
+
+    @abstractmethod
+    def evaluate(self, counts : np.ndarray) -> np.ndarray:
+        pass
+
+    def compare(self, op : Callable[[np.ndarray, np.ndarray], np.ndarray], other : Union[Expression, int, float]) -> Comparison:
+        return Comparison(self, op, other)
+
+    def __gt__(self, other): return self.compare(np.greater, other)
+    def __ge__(self, other): return self.compare(np.greater_equal, other)
+    def __lt__(self, other): return self.compare(np.less, other)
+    def __le__(self, other): return self.compare(np.less_equal, other)
+    def __eq__(self, other): return self.compare(np.equal, other)
+    def __ne__(self, other): return self.compare(np.not_equal, other)
+
+    __hash__ = None
+
+
+class Count(Expression):
+    """
+    Count of the path at index in each tree
+    """
+
+    def __init__(self, index : int):
+        self.index : int = index
+
+    def evaluate(self, counts : np.ndarray) -> np.ndarray:
+        return counts[self.index]
+
+
+class Aggregate(Expression):
+    """
+    Reduction of the counts of the paths at indices (or of all paths if none are given) in each tree
+    """
+
+    reduce : Callable[..., np.ndarray] = None
+
+    def __init__(self, *indices : int):
+        self.indices : Optional[list[int]] = list(indices) if indices else None
+
+    def evaluate(self, counts : np.ndarray) -> np.ndarray:
+        rows = counts if self.indices is None else counts[self.indices]
+        return type(self).reduce(rows, axis=0)
+
+
+class Min(Aggregate):
+    reduce = np.min
+
+
+class Max(Aggregate):
+    reduce = np.max
+
+
+class Sum(Aggregate):
+    reduce = np.sum
+
+
+class Predicate(ABC):
+
+    @abstractmethod
+    def evaluate(self, counts : np.ndarray) -> np.ndarray:
+        pass
+
+    def __and__(self, other : Predicate) -> Predicate: return And(self, other)
+    def __or__(self, other : Predicate) -> Predicate: return Or(self, other)
+    def __invert__(self) -> Predicate: return Not(self)
+
+    def __call__(self, counts : Sequence[int]) -> bool:
+        """
+        Evaluate predicate on the counts of each path in a single tree, as a callable activation function
+        """
+        return bool(self.evaluate(np.asarray(counts).reshape(-1, 1))[0])
+
+
+class Comparison(Predicate):
+
+    def __init__(self, expression : Expression, op : Callable[[np.ndarray, np.ndarray], np.ndarray], other : Union[Expression, int, float]):
+        self.expression : Expression = expression
+        self.op : Callable[[np.ndarray, np.ndarray], np.ndarray] = op
+        self.other : Union[Expression, int, float] = other
+
+    def evaluate(self, counts : np.ndarray) -> np.ndarray:
+        other = self.other.evaluate(counts) if isinstance(self.other, Expression) else self.other
+        return self.op(self.expression.evaluate(counts), other)
+
+
+class And(Predicate):
+
+    def __init__(self, left : Predicate, right : Predicate):
+        self.left : Predicate = left
+        self.right : Predicate = right
+
+    def evaluate(self, counts : np.ndarray) -> np.ndarray:
+        return self.left.evaluate(counts) & self.right.evaluate(counts)
+
+
+class Or(Predicate):
+
+    def __init__(self, left : Predicate, right : Predicate):
+        self.left : Predicate = left
+        self.right : Predicate = right
+
+    def evaluate(self, counts : np.ndarray) -> np.ndarray:
+        return self.left.evaluate(counts) | self.right.evaluate(counts)
+
+
+class Not(Predicate):
+
+    def __init__(self, predicate : Predicate):
+        self.predicate : Predicate = predicate
+
+    def evaluate(self, counts : np.ndarray) -> np.ndarray:
+        return ~self.predicate.evaluate(counts)
@@ -0,0 +1,172 @@
+from __future__ import annotations
+from typing import Iterable, Mapping, Hashable, Optional
+from collections import OrderedDict
+from exploratory.basic.trees import Tree
+from exploratory.basic.symbols import SymbolTable
+
+
+# Kinds of recursion of an id, given the graph of ids adjacent to each id in a corpus
+NON_RECURSIVE = "non_recursive"             # id is on no cycle, so it never appears twice on a path
+DIRECTLY_RECURSIVE = "directly_recursive"   # id is only adjacent to itself (Expr -> Expr)
+VARIABLY_RECURSIVE = "variably_recursive"   # id is on a cycle through other ids (Expr -> Add -> Expr)
+
+
+def get_id_graph(trees : Iterable[Tree]) -> OrderedDict[str, list[str]]:
+    """
+    Get the list of distinct ids adjacent to each id in trees, in order of first appearance
+    Each id is a single entry however many nodes have it, so the graph is the size of the grammar rather than of the corpus
+    """
+
+    # Initialize graph, and set of ids adjacent to each id
+    graph : OrderedDict[str, list[str]] = OrderedDict()
+    seen : dict[str, set[str]] = dict()
+
+    # DFS trees
+    stack = [node for tree in trees for node in tree.adj_gen]
+    while stack:
+        curr = stack.pop()
+        adj = graph.get(curr.id)
+        if adj is None:
+            adj = graph[curr.id] = list()
+            seen[curr.id] = set()
+
+        # Add id of each adjacent node, and adjacent node to stack
+        for node in curr.adj_gen:
+            if node.id not in seen[curr.id]:
+                seen[curr.id].add(node.id)
+                adj.append(node.id)
+            stack.append(node)
+
+    return graph
+
+
+def get_recursion(graph : Mapping[Hashable, Iterable[Hashable]]) -> OrderedDict[Hashable, str]:
+    """
+    Get the kind of recursion of each id in graph (see get_id_graph, relocation.get_relocated_graph or edge counts)
+    Ids are classified by the strongly connected component they are in, found with an iterative version of Tarjan's algorithm:
+    1. Ids alone in their component are non recursive, unless they are adjacent to themselves
+    2. Ids alone in their component and adjacent to themselves are directly recursive
+    3. Ids in a component with other ids are variably recursive
+    """
+
+    # Index of each id in order of discovery, lowest index reachable from each id, and stack of ids in unfinished components
+    index : dict[Hashable, int] = dict()
+    low : dict[Hashable, int] = dict()
+    stack : list[Hashable] = list()
+    on_stack : set[Hashable] = set()
+
+    # Kind of recursion of each id
+    kinds : dict[Hashable, str] = dict()
+
+    # Search from each id not yet discovered
+    for root in graph:
+        if root in index: continue
+
+        # Initialize search with (id, iterator over adjacent ids) pairs
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        search = [(root, iter(graph.get(root, ())))]
+
+        # DFS
+        while search:
+            id, adj = search[-1]
+
+            # Discover next adjacent id, or update lowest index reachable from id
+            for next in adj:
+                if next not in index:
+                    index[next] = low[next] = len(index)
+                    stack.append(next)
+                    on_stack.add(next)
+                    search.append((next, iter(graph.get(next, ()))))
+                    break
+                if next in on_stack:
+                    low[id] = min(low[id], index[next])
+
+            # All adjacent ids were searched
+            else:
+                search.pop()
+                if search:
+                    parent = search[-1][0]
+                    low[parent] = min(low[parent], low[id])
+
+                # Id is the root of a component, pop and classify the component
+                if low[id] == index[id]:
+                    component = list()
+                    while True:
+                        member = stack.pop()
+                        on_stack.remove(member)
+                        component.append(member)
+                        if member == id: break
+                    if len(component) > 1:
+                        kinds.update((member, VARIABLY_RECURSIVE) for member in component)
+                    elif id in graph.get(id, ()):
+                        kinds[id] = DIRECTLY_RECURSIVE
+                    else:
+                        kinds[id] = NON_RECURSIVE
+
+    # Order kinds by discovery of ids
+    return OrderedDict((id, kinds[id]) for id in index)
+
+
+def get_nonrecursive_ids(recursion : Mapping[Hashable, str]) -> frozenset[Hashable]:
+    """
+    Get the set of ids that never appear twice on a path (see partially_relocate)
+    """
+    return frozenset(id for id, kind in recursion.items() if kind == NON_RECURSIVE)
+
+
+def write_recursion(recursion : Mapping[Hashable, str], data_rootdir : str, symbols : Optional[SymbolTable] = None):
+    """
+    Write kind of recursion of each id to file
+    Ids are interned codes of symbols if symbols is given
+    """
+    
+    # Open file
+    f = open(data_rootdir + '/' + "recursion.txt", 'w')
+    
+    # Write each (id, kind) pair
+    for id, kind in recursion.items():
+        if symbols is not None: id = symbols.lookup(id)
+        f.write("{} {}\n".format(id, kind))
+    
+    # Close file
+    f.close()
+
+
+def read_recursion(data_rootdir : str, symbols : Optional[SymbolTable] = None) -> OrderedDict[Hashable, str]:
+    """
+    Read kind of recursion of each id from file
+    Ids are interned with symbols if symbols is given
+    """
+    
+    # Dictionary containing kind of recursion of each id
+    recursion = OrderedDict()
+    
+    # Open file
+    f = open(data_rootdir + '/' + "recursion.txt", 'r')
+    
+    # Parse each line for (id, kind) pair
+    for line in f:
+        id, kind = line.rstrip('\n').split(' ')
+        if symbols is not None: id = symbols.intern(id)
+        recursion[id] = kind
+    
+    # Close file
+    f.close()
+    
+    return recursion
+
+
+def init_recursion(graph : Mapping[Hashable, Iterable[Hashable]], data_rootdir : str, symbols : Optional[SymbolTable] = None) -> OrderedDict[Hashable, str]:
+    """
+    Get and write kind of recursion of each id in graph to file
+    """
+    
+    # Get kind of recursion of each id
+    recursion = get_recursion(graph)
+    
+    # Write kind of recursion of each id
+    write_recursion(recursion, data_rootdir, symbols)
+    
+    return recursion
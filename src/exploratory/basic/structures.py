@@ -1,21 +1,48 @@
 from __future__ import annotations
-from typing import Callable, Iterable, Optional
+from typing import Callable, Iterable, Optional, Union
 from collections import deque, Counter
+import json
+import numpy as np
 from exploratory.basic.trees import Tree
 from exploratory.basic.nodes import HashNode, AbstractNode
+from exploratory.basic.symbols import SymbolTable
+from exploratory.basic.predicates import Predicate
     
 
 class TreeStructure(Tree):
     
-    def __init__(self, n_trees : int = 0):
-        Tree.__init__(self)
+    def __init__(self, n_trees : int = 0, symbols : Optional[SymbolTable] = None, counts_cls : type = Counter):
+        Tree.__init__(self, symbols)
         self.n_trees : int = n_trees
+        
+        # Class of the mapping of tree id to count in the value of each node (Counter or SparseCounts)
+        self.counts_cls : type = counts_cls
+        
+        # Number of modifications, and restructured structures with the version they were computed at
+        self.version : int = 0
+        self.restructured : dict[str, tuple[int, TreeStructure]] = dict()
+        
+        # Index of the node at the end of each path of ids, and of the path of each node, built on first use
+        self.path_index : Optional[dict[tuple[str, ...], HashNode]] = None
+        self.node_paths : Optional[dict[AbstractNode, tuple[str, ...]]] = None
+        
+        # Inverted index of the (depth, parent) of each node with each id, built on first use and maintained as nodes are created
+        self.id_index : Optional[dict[str, dict[HashNode, tuple[int, AbstractNode]]]] = None
+        
+        # Total counts of each tree in the subtree of each node, computed on demand and removed when a node is modified
+        self.totals : Optional[dict[AbstractNode, Counter]] = None
     
-    def add_tree(self, tree : Tree):
+    def add_tree(self, tree : Tree, tree_id : Optional[int] = None, single_pass : bool = True):
         
         # Create unique identifier for tree
-        tree_id = self.n_trees
-        self.n_trees += 1
+        if tree_id is None:
+            tree_id = self.n_trees
+            self.n_trees += 1
+            
+        # Add all paths in one traversal of the tree
+        if single_pass:
+            self.insert_tree(tree, tree_id)
+            return tree_id
         
         # Iterate over each path in the tree
         for path in tree.paths:
@@ -26,82 +53,579 @@ class TreeStructure(Tree):
         # Return the id of tree
         return tree_id
       
-    def add_path(self, path : deque[AbstractNode], tree_id : int):
+    """
+    Add the counts of every path in tree.paths in a single traversal of tree
+    Produces the same structure as calling add_path for each path,
+    but visits each tree node once instead of walking every path from the structure root
+
+    Keeps a stack of frames [structure node, pending count] along the structure path of the current tree node
+    Counts of the paths below a frame are accumulated in it, then added to its node and to its parent frame on backtrack
+    A non-leaf node whose id is already on the structure path is split as in Tree.paths:
+    the path ending at it is counted once per leaf below it, and its descendants continue from the first instance
+    of its id, with the frames after the first instance set aside until backtrack
+    """
+    def insert_tree(self, tree : Tree, tree_id : int):
+        
+        # Initialize frames with structure head, and mapping of each id on structure path to the index of its frame
+        frames : list[list] = [[self, 0]]
+        on_path : dict[str, int] = dict()
+        
+        # Initialize (node ending split path, frames set aside, leaves before split) of each split being traversed
+        splits : list[tuple[AbstractNode, list[list], int]] = list()
+        n_leaves = 0
+        
+        # Initialize stack with (node, step) pairs for head nodes in tree
+        # step is ENTER, LEAVE after a node is added to the structure path, or LEAVE_SPLIT after a split
+        ENTER, LEAVE, LEAVE_SPLIT = 0, 1, 2
+        stack : list[tuple[AbstractNode, int]] = [(adj, ENTER) for adj in tree.adj_gen]
+        
+        # DFS
+        while stack:
+            
+            # Get (node, step) pair from stack
+            node, step = stack.pop()
+            
+            # Backtrack from node on structure path
+            if step == LEAVE:
+                
+                # Add pending count to structure node and parent frame
+                struct_node, pending = frames.pop()
+                del on_path[node.id]
+                struct_node.value[tree_id] += pending
+                if self.totals: self.totals.pop(struct_node, None)
+                frames[-1][1] += pending
+                continue
+                
+            # Backtrack from split
+            if step == LEAVE_SPLIT:
+                
+                # Restore frames set aside
+                end, removed, start = splits.pop()
+                for frame in removed:
+                    on_path[frame[0].id] = len(frames)
+                    frames.append(frame)
+                    
+                # Count path ending at split node once per leaf below it
+                end.value[tree_id] += n_leaves - start
+                if self.totals: self.totals.pop(end, None)
+                frames[-1][1] += n_leaves - start
+                continue
+            
+            # Get the node in structure associated with id below current structure node
+            curr = frames[-1][0]
+            adj = curr.get_adj(node.id)
+            
+            # Create node if it does not exist
+            if adj is None: adj = self.create_adj(curr, node.id)
+                
+            # Node is leaf, count the path ending at it
+            if not node.adj:
+                adj.value[tree_id] += 1
+                if self.totals: self.totals.pop(adj, None)
+                frames[-1][1] += 1
+                n_leaves += 1
+                continue
+                
+            # Second instance of non-leaf node, continue from first instance
+            k = on_path.get(node.id)
+            if k is not None:
+                removed = frames[k + 1:]
+                del frames[k + 1:]
+                for frame in removed: del on_path[frame[0].id]
+                splits.append((adj, removed, n_leaves))
+                stack.append((node, LEAVE_SPLIT))
+                
+            # First instance of non-leaf node, add it to structure path
+            else:
+                on_path[node.id] = len(frames)
+                frames.append([adj, 0])
+                stack.append((node, LEAVE))
+            
+            # Continue traversal
+            stack.extend((adj, ENTER) for adj in node.adj_gen)
+            
+        self.version += 1
+        if self.totals: self.totals.pop(self, None)
+            
+    def remove_tree(self, tree_id : int):
+        
+        # Initialize stack with (parent, node) pairs for head nodes containing tree
+        stack : deque[tuple[AbstractNode, AbstractNode]] = deque((self, adj) for adj in self.adj_gen if tree_id in adj.value)
+        
+        # DFS nodes containing tree
+        # Every path through a node increments its ancestors, so descendants of a node not containing tree do not contain it
+        while stack:
+            
+            # Get (parent, node) pair from stack
+            parent, node = stack.pop()
+            
+            # Remove count of tree_id from node value
+            del node.value[tree_id]
+            if self.totals: self.totals.pop(node, None)
+            
+            # Remove node if no other tree contains it
+            if not node.value:
+                parent.remove_adj(node)
+                if self.path_index is not None or self.id_index is not None or self.totals: self.unindex(node)
+                continue
+            
+            # Continue traversal
+            stack.extend((node, adj) for adj in node.adj_gen if tree_id in adj.value)
+            
+        self.version += 1
+        if self.totals: self.totals.pop(self, None)
+            
+    def replace_tree(self, tree_id : int, tree : Tree):
+        
+        # Remove counts of previous tree and add counts of new tree with the same id
+        self.remove_tree(tree_id)
+        self.add_tree(tree, tree_id)
+    
+    def create_adj(self, curr : AbstractNode, id : str) -> HashNode:
+        
+        # Create node with empty counts below curr
+        adj = HashNode(id, self.counts_cls())
+        curr.add_adj(adj)
+        
+        # Add path of node to index
+        if self.path_index is not None:
+            key = self.node_paths[curr] + (id,)
+            self.path_index[key] = adj
+            self.node_paths[adj] = key
+            
+        # Add occurrence of id to inverted index
+        if self.id_index is not None:
+            depth = self.id_index[curr.id][curr][0] + 1 if curr is not self else 0
+            self.id_index.setdefault(id, dict())[adj] = (depth, curr)
+            
+        return adj
+    
+    def build_index(self):
+        
+        # Initialize index with head
+        self.path_index = dict()
+        self.node_paths = {self : ()}
+        
+        # Initialize stack with (path, node) pairs for head nodes in structure
+        stack : list[tuple[tuple[str, ...], AbstractNode]] = [((adj.id,), adj) for adj in self.adj_gen]
+        
+        # DFS, adding the path of each node to index
+        while stack:
+            key, node = stack.pop()
+            self.path_index[key] = node
+            self.node_paths[node] = key
+            stack.extend((key + (adj.id,), adj) for adj in node.adj_gen)
+            
+    def build_id_index(self):
+        
+        # Initialize inverted index
+        self.id_index = dict()
+        
+        # Initialize stack with (depth, parent, node) triples for head nodes in structure
+        stack : list[tuple[int, AbstractNode, AbstractNode]] = [(0, self, adj) for adj in self.adj_gen]
+        
+        # DFS, adding each node to the occurrences of its id
+        while stack:
+            depth, parent, node = stack.pop()
+            self.id_index.setdefault(node.id, dict())[node] = (depth, parent)
+            stack.extend((depth + 1, node, adj) for adj in node.adj_gen)
+            
+    def occurrences(self, id : str) -> list[tuple[HashNode, int, AbstractNode]]:
+        
+        # Build inverted index on first use
+        if self.id_index is None: self.build_id_index()
+        
+        # Get (node, depth, parent) of each occurrence of id (or its code if ids are interned)
+        if self.symbols is not None: id = self.symbols.code(id)
+        return [(node, depth, parent) for node, (depth, parent) in self.id_index.get(id, dict()).items()]
+            
+    def unindex(self, node : AbstractNode):
+        
+        # Remove node and its descendants from indexes and subtree totals
+        stack : list[AbstractNode] = [node]
+        while stack:
+            node = stack.pop()
+            if self.totals: self.totals.pop(node, None)
+            if self.path_index is not None: del self.path_index[self.node_paths.pop(node)]
+            if self.id_index is not None:
+                occurrences = self.id_index[node.id]
+                del occurrences[node]
+                if not occurrences: del self.id_index[node.id]
+            stack.extend(node.adj_gen)
+            
+    def add_path(self, path : Iterable[AbstractNode], tree_id : int, count : int = 1):
+        
+        # Add the sequence of ids along path
+        self.add_ids((node.id for node in path), tree_id, count)
+            
+    def add_ids(self, ids : Iterable[str], tree_id : int, count : int = 1):
         
         # Traverse path
         curr = self
-        for node in path:
-            
-            # Get next id in path
-            id = node.id
+        for id in ids:
             
             # Get the node in self associated with id
             adj = curr.get_adj(id)
             
             # Create node if it does not exist
-            if adj is None: adj = HashNode(id, Counter())
+            if adj is None: adj = self.create_adj(curr, id)
 
             # Increment count of tree_id in node value                          
-            adj.value[tree_id] += 1
+            adj.value[tree_id] += count
+            if self.totals: self.totals.pop(adj, None)
                 
             # Continue traversal
             curr = adj
             
+        self.version += 1
+        if self.totals: self.totals.pop(self, None)
+            
+    def add_nodes(self, nodes : Iterable[tuple[int, str, int]], tree_id : int):
+        
+        # Initialize path of structure nodes from head to the parent of the current node
+        path : list[AbstractNode] = [self]
+        
+        # Merge each (depth, id, count) triple of a preorder list of nodes into the node with the same path in structure,
+        # so each node is found from its parent instead of from the structure root
+        for depth, id, count in nodes:
+            
+            # Backtrack path to parent of node
+            del path[depth + 1:]
+            curr = path[-1]
+            
+            # Get the node in structure associated with id
+            adj = curr.get_adj(id)
+            
+            # Create node if it does not exist
+            if adj is None: adj = self.create_adj(curr, id)
+            
+            # Increment count of tree_id in node value
+            adj.value[tree_id] += count
+            if self.totals: self.totals.pop(adj, None)
+            
+            # Continue traversal
+            path.append(adj)
+            
+        self.version += 1
+        if self.totals: self.totals.pop(self, None)
+        
     def add_counts(self, other : TreeStructure):
 
-        # Iterate over each complete path in structure
-        for path in other.complete_paths:
+        # Initialize stack with (parent in structure, node in other) pairs for head nodes in other
+        stack : list[tuple[AbstractNode, AbstractNode]] = [(self, adj) for adj in other.adj_gen]
+        
+        # DFS other, merging each of its nodes into the node with the same path in structure
+        while stack:
+            
+            # Get (parent, node) pair from stack
+            curr, node = stack.pop()
+            
+            # Get the node in structure associated with id of node
+            adj = curr.get_adj(node.id)
+            
+            # Create node if it does not exist
+            if adj is None: adj = self.create_adj(curr, node.id)
+
+            # Update counts in node
+            adj.value.update(node.value)
+            if self.totals: self.totals.pop(adj, None)
+            
+            # Continue traversal
+            stack.extend((adj, child) for child in node.adj_gen)
+            
+        self.version += 1
+        if self.totals: self.totals.pop(self, None)
+
+    def to_json(self) -> dict:
+        
+        # Preorder list of (depth, id, list of (tree_id, count) pairs) of each node
+        nodes = list()
+        positions : dict[AbstractNode, int] = dict()
+        for depth, node in self.dfs():
+            positions[node] = len(nodes)
+            nodes.append((depth, node.id, list(node.value.items())))
+        data = {"n_trees" : self.n_trees, "nodes" : nodes}
+        
+        # List of (id, preorder positions of its occurrences) pairs
+        if self.id_index is not None:
+            data["occurrences"] = [(id, [positions[node] for node in occurrences]) for id, occurrences in self.id_index.items()]
+            
+        return data
+    
+    @classmethod
+    def from_json(cls, data : dict, symbols : Optional[SymbolTable] = None, counts_cls : type = Counter) -> TreeStructure:
+        
+        # Build structure from preorder list of nodes
+        nodes = [HashNode(id, counts_cls(dict(counts))) for _, id, counts in data["nodes"]]
+        structure = cls.from_parser((depth, node) for (depth, _, _), node in zip(data["nodes"], nodes))
+        structure.n_trees = data["n_trees"]
+        structure.symbols = symbols
+        structure.counts_cls = counts_cls
+        
+        # Inverted index is built on first use if it was not saved
+        if "occurrences" not in data: return structure
+        
+        # Get parent of each node from depths
+        parents : list[AbstractNode] = list()
+        path : list[AbstractNode] = [structure]
+        for (depth, _, _), node in zip(data["nodes"], nodes):
+            del path[depth + 1:]
+            parents.append(path[-1])
+            path.append(node)
+            
+        # Restore inverted index from preorder positions of occurrences
+        structure.id_index = {
+            id : {nodes[i] : (data["nodes"][i][0], parents[i]) for i in positions} 
+            for id, positions in data["occurrences"]
+        }
+        return structure
+    
+    def save(self, filepath : str):
+        
+        # Write structure to file
+        f = open(filepath, 'w')
+        json.dump(self.to_json(), f)
+        f.close()
+        
+    @classmethod
+    def load(cls, filepath : str, symbols : Optional[SymbolTable] = None, counts_cls : type = Counter) -> TreeStructure:
+        
+        # Read structure from file
+        f = open(filepath, 'r')
+        structure = cls.from_json(json.load(f), symbols, counts_cls)
+        f.close()
+        return structure
+
+    """
+    Get the total count of each tree in the nodes of the subtree of node (the whole structure by default)
+    Totals are kept for each node in the subtree, and only the totals of nodes modified since are recomputed,
+    from the bottom up, so repeated calls on an unmodified structure are a lookup
+    """
+    def subtree_totals(self, node : Optional[AbstractNode] = None) -> Counter:
+        
+        # Initialize totals
+        if node is None: node = self
+        if self.totals is None: self.totals = dict()
+        
+        # Initialize stack with (node, expanded) pair for node
+        stack : list[tuple[AbstractNode, bool]] = [(node, False)]
+        
+        # Postorder DFS nodes without totals
+        while stack:
+            
+            # Get (node, expanded) pair from stack
+            curr, expanded = stack.pop()
+            
+            # Visit children without totals before node
+            if not expanded:
+                if curr in self.totals: continue
+                stack.append((curr, True))
+                stack.extend((adj, False) for adj in curr.adj_gen if adj not in self.totals)
+                continue
+            
+            # Total counts of node and the subtree of each child
+            total = Counter(dict(curr.value.items())) if curr.value is not None else Counter()
+            for adj in curr.adj_gen: total.update(self.totals[adj])
+            self.totals[curr] = total
+            
+        return self.totals[node]
+    
+    def get_path(self, ids : Iterable[str]) -> Optional[list[HashNode]]:
+        
+        # Traverse path from head
+        nodes : list[HashNode] = list()
+        curr = self
+        for id in ids:
+            
+            # Get the node in structure associated with id (or its code if ids are interned)
+            curr = curr.get_adj(id if self.symbols is None else self.symbols.code(id))
+            
+            # Path does not exist
+            if curr is None: return None
+            nodes.append(curr)
+            
+        return nodes
+
+    def get_node(self, ids : Iterable[str]) -> Optional[HashNode]:
+        
+        # Build index on first use
+        if self.path_index is None: self.build_index()
+        
+        # Get the node at the end of path (the codes of ids if ids are interned)
+        key = tuple(ids) if self.symbols is None else tuple(self.symbols.code(id) for id in ids)
+        return self.path_index.get(key) if key else self
+    
+    """
+    Find each path matching a glob-style pattern of ids separated by '/', with the node at its end
+    A '*' matches any one id, and '**' matches any sequence of ids (including none)
+    The ids before the first wildcard are looked up in the path index, 
+    and the rest of the pattern is matched in one traversal of the nodes below them
+    Returns a list of (path of ids, node) pairs
+    """
+    def match(self, pattern : Union[str, Iterable[str]]) -> list[tuple[tuple[str, ...], HashNode]]:
+        
+        # Split pattern into segments
+        segments = pattern.split("/") if isinstance(pattern, str) else list(pattern)
+        
+        # Look up the node at the end of the segments before the first wildcard
+        k = 0
+        while k < len(segments) and segments[k] not in ("*", "**"): k += 1
+        start = self.get_node(segments[:k])
+        if start is None: return list()
+        
+        # Use the codes of the remaining ids if ids are interned
+        if self.symbols is not None:
+            segments = segments[:k] + [segment if segment in ("*", "**") else self.symbols.code(segment) for segment in segments[k:]]
+        
+        # Initialize stack with (node, index of next segment) pairs, and set of visited pairs at '**' segments
+        stack : list[tuple[AbstractNode, int]] = [(start, k)]
+        visited : set[tuple[AbstractNode, int]] = set()
+        
+        # Initialize matching nodes in order of discovery
+        matches : dict[AbstractNode, None] = dict()
+        
+        # DFS nodes that may match the remaining segments
+        while stack:
+            
+            # Get (node, index) pair from stack
+            node, i = stack.pop()
+            
+            # All segments matched
+            if i == len(segments):
+                matches[node] = None
+                continue
+            
+            # Match no more ids, or one id and remain at '**'
+            segment = segments[i]
+            if segment == "**":
+                if (node, i) in visited: continue
+                visited.add((node, i))
+                stack.extend((adj, i) for adj in node.adj_gen)
+                stack.append((node, i + 1))
+            
+            # Match any one id
+            elif segment == "*":
+                stack.extend((adj, i + 1) for adj in node.adj_gen)
+                
+            # Match id
+            else:
+                adj = node.get_adj(segment)
+                if adj is not None: stack.append((adj, i + 1))
+                
+        # Get the path of each matching node from index
+        paths = [self.node_paths[node] for node in matches]
+        if self.symbols is not None: paths = [tuple(self.symbols.lookup(code) for code in path) for path in paths]
+        return list(zip(paths, matches))
+    
+    def restructure(self, id : str) -> TreeStructure:
+        
+        # Restructure on a single id
+        return self.restructure_many((id,))[id]
+    
+    def combine_occurrences(self, id : str, combined : TreeStructure):
+        
+        # Get occurrences of id from the shallowest, so the first instance along a path is visited before the others
+        occurrences = sorted(self.id_index.get(id, dict()).items(), key=lambda item : item[1][0])
+        
+        # Initialize set of occurrences inside a subtree already combined
+        combined_occurrences : set[AbstractNode] = set()
+        
+        # Iterate over each first instance of id
+        for occurrence, _ in occurrences:
+            if occurrence in combined_occurrences: continue
             
-            # Traverse path
-            curr = self
-            for node in path:
+            # Initialize stack with (parent in combined structure, node) pair for first instance
+            stack : list[tuple[AbstractNode, AbstractNode]] = [(combined, occurrence)]
+            
+            # DFS subtree of first instance, merging each node into combined structure
+            while stack:
                 
-                # Get next id in path
-                id = node.id
+                # Get (parent, node) pair from stack
+                curr, node = stack.pop()
+                if node.id == id: combined_occurrences.add(node)
                 
-                # Get the node in structure associated with current id
-                adj = curr.get_adj(id)
+                # Get the node in combined structure associated with id of node
+                adj = curr.get_adj(node.id)
                 
                 # Create node if it does not exist
-                if adj is None: adj = HashNode(id, Counter())
-
+                if adj is None: adj = combined.create_adj(curr, node.id)
+                
                 # Update counts in node
                 adj.value.update(node.value)
                 
                 # Continue traversal
-                curr = adj
-
-    def restructure(self, id : str):
+                stack.extend((adj, child) for child in node.adj_gen)
+                
+    def combine_traversal(self, combined : dict[str, TreeStructure]):
         
-        # Initialize combined structure
-        combined = TreeStructure(self.n_trees)
-
-        # Initialize stack with head nodes in structure
-        stack : list[AbstractNode] = deque(adj for adj in self.adj_gen)
+        # Initialize stack with (node, cursors) pairs for head nodes in structure
+        # cursors holds a (target id, parent of node in combined structure) pair for each target above node
+        stack : list[tuple[AbstractNode, tuple]] = [(adj, ()) for adj in self.adj_gen]
         
         # DFS
         while stack:
             
-            # Get node from stack
-            node = stack.pop()
+            # Get (node, cursors) pair from stack
+            node, cursors = stack.pop()
             
-            # Node has target id
-            if node.id == id: 
+            # Node has a target id not yet found on its path, start combining at node
+            if node.id in combined and all(target != node.id for target, _ in cursors):
+                cursors += ((node.id, combined[node.id]),)
+                
+            # Merge node into the combined structure of each target above it
+            next_cursors = list()
+            for target, curr in cursors:
                 
-               # Create structure rooted at node
-               structure = TreeStructure(self.n_trees)
-               structure.add_adj(node)
-               
-               # Add counts in new structure to combined structure
-               combined.add_counts(structure)
-               
-               # Stop traversal of node descendents
-               continue
+                # Get the node in combined structure associated with id of node
+                adj = curr.get_adj(node.id)
+                
+                # Create node if it does not exist
+                if adj is None: adj = combined[target].create_adj(curr, node.id)
+                    
+                # Update counts in node
+                adj.value.update(node.value)
+                next_cursors.append((target, adj))
             
             # Continue traversal
-            stack.extend(adj for adj in node.adj_gen)
+            next_cursors = tuple(next_cursors)
+            stack.extend((adj, next_cursors) for adj in node.adj_gen)
+            
+    """
+    Combine the subtrees rooted at the first instance of each of ids along every path into one structure per id
+    The subtrees of a single id are found from its occurrences in the inverted index if there is one,
+    otherwise all structures are built in a single traversal, merging each node under a target into its structure directly
+    Results are memoized until the structure is next modified, so they must not be modified by the caller
+    """
+    def restructure_many(self, ids : Iterable[str]) -> dict[str, TreeStructure]:
+        
+        # Get memoized structures of the current version
+        results : dict[str, TreeStructure] = dict()
+        missing : list[str] = list()
+        for id in ids:
+            entry = self.restructured.get(id)
+            if entry is not None and entry[0] == self.version:
+                results[id] = entry[1]
+            else:
+                missing.append(id)
+        if not missing: return results
+        
+        # Initialize combined structure for the code of each missing id, if ids are interned
+        codes = {id : (self.symbols.code(id) if self.symbols is not None else id) for id in missing}
+        combined = {code : TreeStructure(self.n_trees, self.symbols, self.counts_cls) for code in codes.values()}
+        
+        # Combine from the occurrences of a single target in the inverted index (built on first use), or in one traversal of the structure
+        if len(combined) == 1:
+            if self.id_index is None: self.build_id_index()
+            for code, structure in combined.items(): self.combine_occurrences(code, structure)
+        else:
+            self.combine_traversal(combined)
+            
+        # Memoize structures
+        for id, code in codes.items():
+            results[id] = combined[code]
+            self.restructured[id] = (self.version, combined[code])
                         
-        return combined
+        return results
     
                     
 """
@@ -123,63 +647,71 @@ class StructureQueryTool:
     def __init__(self, structure : TreeStructure):
         self.structure : TreeStructure = structure
         
-    def matrix(self, paths : Optional(Iterable[Iterable[str]]), trees : Optional(Iterable[int])):
+    def matrix(self, paths : Optional[Iterable[Iterable[str]]] = None, trees : Optional[Iterable[int]] = None, subtrees : bool = False) -> Counter:
         
-        # Initialize iterator that gets the node in structure at the end of each path
+        # Get the total counts of each tree at the end of each path (or in its subtree)
         # paths == None references all paths beginning at the structure root
         if paths is None:
-            pnode_iter = self.dfs()
+            counts_iter = [self.structure.subtree_totals()]
         else:  
-            pnode_iter = (self.get_path(path) for path in paths)
+            nodes = (self.structure.get_node(path) for path in paths)
+            counts_iter = (self.structure.subtree_totals(node) if subtrees else node.value for node in nodes if node is not None)
             
         # Initialize counter for total counts of each tree in all paths
         counter = Counter()
+        if trees is not None: trees = list(trees)
         
-        # Iterate over each pnode
-        for pnode in pnode_iter:
+        # Iterate over counts at each path
+        for counts in counts_iter:
             
-            # Update counter with counts of each tree at pnode
+            # Update counter with counts of each tree
             # trees == None references all trees in structure
             if trees is None:
-                counter.update(pnode.value)
+                counter.update(counts)
             else:
-                counter.update({tree : pnode.value[tree] for tree in trees})
+                counter.update({tree : counts[tree] for tree in trees if tree in counts})
                 
         return counter
             
+    def count_matrix(self, paths : Iterable[Iterable[str]]) -> np.ndarray:
         
-    def query(self, paths : deque[str], activation : Callable[..., bool]):
-        
-        # Initialize list of nodes where the ith node is the node at the end of the ith path in structure 
-        nodes : list[HashNode] = list()
+        # Initialize matrix where row i holds the count of the ith path in each tree
+        paths = list(paths)
+        counts = np.zeros((len(paths), self.structure.n_trees), dtype=np.int64)
         
         # Iterate over each path
-        for path in paths:
+        for i, path in enumerate(paths):
+            
+            # Path does not appear in any tree
+            node = self.structure.get_node(path)
+            if node is None or node.value is None: continue
             
-            # Add node at the end of path to nodes
-            node = self.structure.get_path(path)[-1]
-            nodes.append(node)
+            # Scatter the counts of each tree at the end of path into its row
+            value = node.value
+            tree_ids = np.fromiter(value.keys(), dtype=np.int64, count=len(value))
+            counts[i, tree_ids] = np.fromiter(value.values(), dtype=np.int64, count=len(value))
             
+        return counts
+        
+    def query(self, paths : Iterable[Iterable[str]], activation : Union[Predicate, Callable[[list[int]], bool]]) -> int:
+        
+        # Gather counts of each path in each tree
+        counts = self.count_matrix(paths)
+        
+        # Evaluate vectorized activation on all trees at once
+        if isinstance(activation, Predicate):
+            return int(np.count_nonzero(activation.evaluate(counts)))
+        
         # Initialize number of trees for which the counts of each path in paths satisfies the activation function
         n_activations : int = 0
         
-        # Iterate over each tree id
-        for t in range(self.structure.n_trees):    
-            
-            # Initialize list of counts for the number of times each path appears
-            counts : list[int] = list()
-            
-            # Iterate over each end of path node
-            for node in nodes:
-                
-                # Get number of times path appears in tree
-                count = node.value[t] if node.value is not None and t in node.value else 0
-                counts.append(count)
+        # Iterate over the counts of each path in each tree
+        for tree_counts in counts.T.tolist():
                 
             # If counts for each relevant path in tree satisfies the activation function
-            if activation(counts):
+            if activation(tree_counts):
                 
                 # Increment activation count
                 n_activations += 1
                 
-        return n_activations
\ No newline at end of file
+        return n_activations
@@ -0,0 +1,74 @@
+from __future__ import annotations
+from typing import Iterable, Optional
+
+
+class SymbolTable:
+    """
+    Mapping of each node id to a small integer code
+    Codes are assigned in order of first appearance, so the ith line of a saved table is the id with code i
+    """
+
+    def __init__(self, ids : Iterable[str] = ()):
+        self.ids : list[str] = list()
+        self.codes : dict[str, int] = dict()
+        for id in ids: self.intern(id)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, id : str) -> bool:
+        return id in self.codes
+
+    def intern(self, id : str) -> int:
+        """
+        Get the code of id, assigning it a new code if it has not been seen before
+        """
+        code = self.codes.get(id)
+        if code is None:
+            code = self.codes[id] = len(self.ids)
+            self.ids.append(id)
+        return code
+
+    def code(self, id : str) -> Optional[int]:
+        """
+        Get the code of id, or None if it has not been seen before
+        """
+        return self.codes.get(id)
+
+    def lookup(self, code : int) -> str:
+        """
+        Get the id associated with code
+        """
+        return self.ids[code]
+
+    def save(self, filepath : str):
+        """
+        Write symbol table to file, one id per line
+        """
+
+        # Open file
+        f = open(filepath, 'w')
+
+        # Write each id in order of its code
+        for id in self.ids:
+            f.write("{}\n".format(id))
+
+        # Close file
+        f.close()
+
+    @classmethod
+    def load(cls, filepath : str) -> SymbolTable:
+        """
+        Read symbol table from file
+        """
+
+        # Open file
+        f = open(filepath, 'r')
+
+        # Intern each id in order of its code
+        table = cls(line.rstrip("\n") for line in f)
+
+        # Close file
+        f.close()
+
+        return table
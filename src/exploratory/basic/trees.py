@@ -1,14 +1,52 @@
 from __future__ import annotations
-from typing import Generator
+from typing import Generator, Iterator, Optional, Sequence, Type
 from collections import deque, Counter
 from exploratory.basic.nodes import Node, AbstractNode
-from exploratory.basic.parsers import Parser, StandardParser
+from exploratory.basic.parsers import Parser, StandardParser, BinaryParser, StreamingFlangParser, write_binary, get_flang_version
+from exploratory.basic.cache import TreeCache
+from exploratory.basic.symbols import SymbolTable
+
+
+class PathView(Sequence):
+    """
+    Read-only view of a path made of ranges [start, end) of the nodes in another path
+    Used to yield split paths without copying nodes
+    """
+
+    __slots__ = ("nodes", "ranges")
+
+    def __init__(self, nodes : list[AbstractNode], ranges : list[tuple[int, int]]):
+        self.nodes : list[AbstractNode] = nodes
+        self.ranges : list[tuple[int, int]] = ranges
+
+    def __iter__(self) -> Iterator[AbstractNode]:
+        nodes = self.nodes
+        for start, end in self.ranges:
+            for i in range(start, end):
+                yield nodes[i]
+
+    def __len__(self) -> int:
+        return sum(end - start for start, end in self.ranges)
+
+    def __getitem__(self, k : int) -> AbstractNode:
+        if k < 0: k += len(self)
+        for start, end in self.ranges:
+            if 0 <= k < end - start: return self.nodes[start + k]
+            k -= end - start
+        raise IndexError("path index out of range")
+
+    def __repr__(self) -> str:
+        return "PathView({})".format([node.id for node in self])
 
 
 class Tree(Node):
     
-    def __init__(self):
+    # Cache of parsed trees used by from_file and from_source when no cache is given
+    cache : Optional[TreeCache] = None
+    
+    def __init__(self, symbols : Optional[SymbolTable] = None):
         Node.__init__(self, "head")
+        self.symbols : Optional[SymbolTable] = symbols
         
     """
     Depth first search tree, yielding depth and node at each step
@@ -34,72 +72,83 @@ class Tree(Node):
     Instance of a path with a node repeated more than twice are recursively
     split into a path from root to first instance, 
     and a path from root up to first instance combined with path from second instance to leaf.
+    
+    Paths are found in one DFS and yielded as views over the path from root to the current node,
+    which are only valid until the traversal continues
+    The index of the first instance of each id on the split path is kept, so repeated ids are found without rescanning
     """
     @property
-    def paths(self) -> Generator[deque[AbstractNode], None, None]:
-
-        # Iterate over each path in tree
-        for full_path in self.complete_paths:
-
-            # Possibly recursive paths
-            paths : deque[deque[AbstractNode]] = deque()
-            paths.append(full_path)
+    def paths(self) -> Generator[PathView, None, None]:
+        
+        # Initialize path from root, and action to undo on backtrack from each of its nodes
+        path : list[AbstractNode] = list()
+        undo : list = list()
+        
+        # Initialize split path as ranges [start, end) of path, where the last range is open and ends at the current node
+        ranges : list[tuple[int, int]] = [(0, -1)]
+        
+        # Initialize mapping of each id on split path to the index in path of its instance
+        on_path : dict[str, int] = dict()
+        
+        # Initialize paths ending at each split node above the current node
+        splits : list[PathView] = list()
+        
+        # DFS
+        for depth, node in self.dfs():
+            
+            # Backtrack path to proper depth
+            while len(path) > depth:
+                path.pop()
+                action = undo.pop()
+                
+                # Restore split path from before split node
+                if type(action) is tuple:
+                    ranges, removed = action
+                    on_path.update(removed)
+                    splits.pop()
+                    
+                # Remove id of node from split path (ids may be str or interned int codes)
+                elif action is not None:
+                    del on_path[action]
+            
+            # Add node to path
+            i = len(path)
+            path.append(node)
             
-            # Repeat until all paths are yielded (reduced to a non-recursive representation)
-            while paths:
+            # Node is leaf
+            if not node.adj:
                 
-                # Get next path
-                path = paths.pop()
+                # Yield the path ending at each split node above leaf, then the split path ending at leaf
+                yield from splits
+                yield PathView(path, ranges[:-1] + [(ranges[-1][0], i + 1)])
+                undo.append(None)
+            
+            # First instance of node
+            elif node.id not in on_path:
+                on_path[node.id] = i
+                undo.append(node.id)
                 
-                # Initialize set of node ids visited along path
-                visited : set[str] = set()
+            # Second instance of node, node is not leaf
+            else:
                 
-                # Iterate over each node in path
-                for curr in path:
-                    
-                    # First instance of node
-                    if curr.id not in visited:
-                        visited.add(curr.id)
-                        
-                    # Second instance of node
-                    # Node is not leaf
-                    elif curr != path[-1]:
-                        
-                        # Initialize two new paths
-                        new1 = deque()
-                        new2 = deque()
-                        
-                        # Initialize path node iterator
-                        path_iter = iter(node for node in path)
-                        
-                        # Add nodes to both paths from head to first instance of node
-                        for node in path_iter:
-                            new1.append(node)
-                            new2.append(node)
-                            if node.id == curr.id: break
-                            
-                        # Add nodes to first path from after first instance of node to second instance of node
-                        for node in path_iter:
-                            new1.append(node)
-                            if node.id == curr.id: break
-                            
-                        # Add nodes to second path from after second instance of node to leaf
-                        for node in path_iter:
-                            new2.append(node)
-                                                            
-                        # Yield the first path
-                        yield new1
-                            
-                        # Add second path to stack
-                        paths.append(new2)
-                        break
-                    
-                    # Node is leaf
-                    if curr == path[-1]:
-                        
-                        # Yield path
-                        yield path
-                            
+                # Path ending at node
+                splits.append(PathView(path, ranges[:-1] + [(ranges[-1][0], i + 1)]))
+                
+                # Find range containing first instance of node
+                first = on_path[node.id]
+                k = len(ranges) - 1
+                while ranges[k][0] > first: k -= 1
+                
+                # Remove ids after first instance from split path
+                removed : dict[str, int] = dict()
+                for start, end in ranges[k:]:
+                    for j in range(max(start, first + 1), end if end >= 0 else i):
+                        removed[path[j].id] = j
+                        del on_path[path[j].id]
+                undo.append((ranges, removed))
+                
+                # Continue split path from first instance of node
+                ranges = ranges[:k] + [(ranges[k][0], first + 1), (i + 1, -1)]
 
     """
     Enumerates each path from root to node in set of trees
@@ -152,22 +201,61 @@ class Tree(Node):
         for depth, node in traversal:
             
             # Write to file
-            id = node.id
+            id = node.id if self.symbols is None else self.symbols.lookup(node.id)
             value = node.value if node.value is not None else ""
             f.write("{}{} {}\n".format('| ' * depth, id, value))
             
         # Close file
         f.close()
-            
-        
+
+
+    """
+    Output binary representation of tree to file
+    Stores the preorder depths, interned id codes and interned value strings as contiguous arrays
+    """
+    def to_binary(self, filepath : str):
+
+        # Initialize preorder arrays
+        depths : list[int] = list()
+        codes : list[int] = list()
+        value_codes : list[int] = list()
+
+        # Initialize mappings of ids and value strings to their codes
+        id_codes : dict[str, int] = dict()
+        value_str_codes : dict[str, int] = dict()
+
+        # Iterate over each (depth, node) pair in traversal
+        for depth, node in self.dfs():
+
+            # Intern id
+            id = node.id if self.symbols is None else self.symbols.lookup(node.id)
+            code = id_codes.get(id)
+            if code is None: code = id_codes[id] = len(id_codes)
+
+            # Intern value in its text representation
+            value_code = -1
+            if node.value is not None:
+                value_str = "{}".format(node.value)
+                value_code = value_str_codes.get(value_str)
+                if value_code is None: value_code = value_str_codes[value_str] = len(value_str_codes)
+
+            # Add node to arrays
+            depths.append(depth)
+            codes.append(code)
+            value_codes.append(value_code)
+
+        # Write to file
+        write_binary(filepath, depths, codes, value_codes, list(id_codes), list(value_str_codes))
+
+
     """
     Initialize tree from parser
     """
     @classmethod
     def from_parser(cls, tp : Parser) -> Tree:
         
-        # Initialize tree
-        tree = cls()
+        # Initialize tree with the symbol table used by the parser
+        tree = cls(getattr(tp, "symbols", None))
         
         # Path from root to node and depth of previous node
         path : deque[AbstractNode] = deque()
@@ -195,123 +283,54 @@ class Tree(Node):
     Initialize tree from text file
     """
     @classmethod
-    def from_file(cls, filepath : str) -> Tree:
+    def from_file(cls, filepath : str, symbols : Optional[SymbolTable] = None, node_cls : Type[AbstractNode] = Node, cache : Optional[TreeCache] = None) -> Tree:
 
         # Parse filepath using standard parser
-        tp = StandardParser(Node, str)(filepath)
+        tp = StandardParser(node_cls, str, symbols)(filepath)
+        return cls.from_cached_parser(tp, cache, "StandardParser", "", node_cls)
+
+
+    """
+    Initialize tree from the parse tree of a Fortran source file
+    """
+    @classmethod
+    def from_source(cls, filepath : str, symbols : Optional[SymbolTable] = None, node_cls : Type[AbstractNode] = Node, cache : Optional[TreeCache] = None) -> Tree:
+
+        # Parse filepath using flang parser
+        # Cached trees are only valid for the version of flang-new that produced them
+        tp = StreamingFlangParser(node_cls, symbols)(filepath)
+        version = get_flang_version() if cache is not None or cls.cache is not None else ""
+        return cls.from_cached_parser(tp, cache, "FlangParser", version, node_cls)
+
+
+    """
+    Initialize tree from parser, loading it from cache if it has already been parsed
+    Uses the class cache if cache is None, and does not cache the tree if both are None
+    """
+    @classmethod
+    def from_cached_parser(cls, tp : Parser, cache : Optional[TreeCache], parser : str, version : str, node_cls : Type[AbstractNode] = Node) -> Tree:
+
+        # Parse tree if there is no cache
+        if cache is None: cache = cls.cache
+        if cache is None: return cls.from_parser(tp)
+
+        # Load tree from cache
+        key = cache.key(tp.filepath, parser, version)
+        cached = cache.lookup(key)
+        if cached is not None: return cls.from_binary(cached, tp.symbols, node_cls)
+
+        # Parse tree and add it to cache
+        tree = cls.from_parser(tp)
+        cache.store(key, tree.to_binary)
+        return tree
+
+
+    """
+    Initialize tree from binary file
+    """
+    @classmethod
+    def from_binary(cls, filepath : str, symbols : Optional[SymbolTable] = None, node_cls : Type[AbstractNode] = Node) -> Tree:
+
+        # Parse filepath using binary parser
+        tp = BinaryParser(node_cls, str, symbols)(filepath)
         return cls.from_parser(tp)
-    
-    
-    
-"""
-    
-        # Initialize path
-        maxlen = 32
-        path : deque[AbstractNode] = deque(maxlen=maxlen)
-        recursed : deque[AbstractNode] = deque()
-        
-        # Initialize mapping of node ids to whether or not they have been visited
-        counts = Counter()
-        is_recursed = dict()
-        
-        # Initialize previous depth
-        prev_depth = 0
-        
-        # Initialize depth of recursive portion of path
-        recursive_depth = 0
-        
-        # DFS
-        for depth, node in self.dfs():
-            #print(prev_depth, depth, recursive_depth, prev_depth - depth - recursive_depth > 0)
-            # Backtrack to desired depth
-            if prev_depth > depth:
-                print({"prev_depth":prev_depth, "depth":depth, "recursive_depth":recursive_depth})
-                
-                diff = prev_depth - depth + 1
-                if diff >= recursive_depth:
-                    diff -= recursive_depth
-                    depth -= recursive_depth
-                    recursive_depth = 0
-                else:
-                    depth -= diff
-                    recursive_depth -= diff
-                    
-                prevs = []
-                for i in range(diff): 
-                    prev = path.pop()
-                    if counts[prev.id] > 1: 
-                        counts[prev.id] -= 1
-                    elif counts[prev.id] == 1:
-                        counts[prev.id] -= 1
-                        is_recursed[prev.id] = False
-                    prevs.append(prev)
-    
-                for p in reversed(prevs):
-                    print("- Node ({})".format(p.id))
-                for p in path:
-                    print(p.id)
-                    
-                    
-            # Node is recursed
-            if node.id in counts and counts[node.id] > 0:
-                is_recursed[node.id] = True
-                
-                # Check is the most recent recursed node
-                for prev in reversed(path):
-                    
-                    # Node is the most recent recursed node
-                    if prev.id == node.id:
-                        
-                        # Yield singly recursed path
-                        path.append(node)
-                        yield path
-                        path.pop()
-                        
-                        # Backtrack to previous instance (but do not remove)
-                        prevs = []
-                        while path[-1].id != node.id:
-                            prev = path.pop()
-                            if counts[prev.id] > 1: 
-                                counts[prev.id] -= 1
-                            elif counts[prev.id] == 1:
-                                counts[prev.id] -= 1
-                                is_recursed[prev.id] = False
-                            prevs.append(prev)
-                            recursive_depth += 1
-                        recursive_depth += 1
-                        for p in reversed(prevs):
-                            print("- Node ({})".format(p.id))
-                        for p in path:
-                            if p.id == node.id:
-                                print("Recursed ({})".format(p.id))
-                            else:
-                                print("Node ({})".format(p.id))
-                        break
-                        
-                    # Node is not the most recent recused node
-                    elif is_recursed[prev.id]:
-                        break
-                    
-            # Node is not repeated
-            else:
-                
-                # Increase maximum size of path if necessary
-                if len(path) == maxlen:               
-                    maxlen *= 2
-                    path = deque(path, maxlen=maxlen)
-                
-                # Add node id to path and is_visited dict
-                path.append(node)
-                is_visited[node.id] = True
-                    
-                # Yield path if node is a leaf node
-                if not node.adj: 
-                    yield path
-                    print("+ Leaf ({})".format(node.id))
-                else:
-                    print("+ Node ({})".format(node.id))
-                
-            # Update depth
-            prev_depth = depth
-            
-"""
\ No newline at end of file
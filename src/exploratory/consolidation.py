@@ -1,67 +1,117 @@
-from typing import Union
+from typing import Iterable, Optional, Union
 from utilities.types.tree_node import TreeNode
 
 
-def consolidate(trees : Union[TreeNode, list[TreeNode]], start_node = None, ignore_nodes = None):
-    """_
+class Consolidation:
+    """
+    Consolidated tree of a set of trees, built by merging one tree at a time (see consolidate)
+    Each merge is an iterative DFS of the tree alongside the consolidated tree, so the depth of trees is not bounded by the recursion limit,
+    and only the consolidated tree is kept between merges, so merged trees can be freed
+    """
+
+    def __init__(self, start_node : Optional[str] = None, ignore_nodes : Optional[Iterable[str]] = None):
+        self.start_node : Optional[str] = start_node
+        self.ignore_nodes : set[str] = set(ignore_nodes) if ignore_nodes is not None else set()
+
+        # Consolidated tree, rooted at start_node if given, or at the root of the first tree otherwise
+        self.root : Optional[TreeNode] = TreeNode(start_node) if start_node is not None else None
+
+    def add_tree(self, tree : TreeNode):
+        """
+        Merge tree into consolidated tree, or all subtrees of tree rooted at start_node if start_node is given
+        """
+
+        # Start node is not given, merge tree
+        if self.start_node is None:
+            self.merge([tree])
+            return
+
+        # Start node is given, merge all subtrees rooted at start_node
+        subtrees = list(tree.walk(self.start_node))
+        if tree.name == self.start_node: subtrees.append(tree)
+        self.merge(subtrees)
+
+    def merge(self, trees : list[TreeNode]):
+        """
+        Merge the paths of trees into consolidated tree
+        Nodes are merged in preorder, grouping the children of all nodes merged into the same consolidated node by name,
+        so the children of each consolidated node are in the order in which they first appear
+        """
+
+        # Assert all trees are rooted at the same node
+        if not trees: return
+        if self.root is None: self.root = TreeNode(trees[0].name)
+        for tree in trees: assert tree.name == self.root.name
+
+        # Ignore children of root if it is one of the ignore_nodes
+        if self.root.name in self.ignore_nodes: return
+
+        # Merge trees into root
+        merge_nodes(trees, self.root, self.ignore_nodes)
+
+
+def merge_nodes(nodes : list[TreeNode], consolidated : TreeNode, ignore_nodes : set[str] = frozenset()):
+    """
+    Merge the descendants of a group of nodes into the descendants of consolidated node (see Consolidation.merge)
+    Descendants that are one of the ignore_nodes are merged without their children
+    """
+
+    # Initialize stack with (group of nodes, consolidated node) pairs
+    stack : list[tuple[list[TreeNode], TreeNode]] = [(nodes, consolidated)]
+
+    # DFS
+    while stack:
+
+        # Get group of nodes and the consolidated node they are merged into from stack
+        nodes, consolidated = stack.pop()
+
+        # Group children of nodes together that have the same name
+        groups : dict[str, list[TreeNode]] = dict()
+        for node in nodes:
+            for child in node.children:
+                group = groups.get(child.name)
+                if group is None:
+                    groups[child.name] = [child]
+                else:
+                    group.append(child)
+        if not groups: continue
+
+        # Merge each group into the child of consolidated node with the same name, creating it if it does not exist
+        # Children of consolidated nodes created by this merge are all created here, so they do not need to be looked up
+        pairs = list()
+        if not consolidated.children:
+            for name, group in groups.items():
+                next = TreeNode(name)
+                consolidated.children.append(next)
+                if name not in ignore_nodes: pairs.append((group, next))
+        else:
+            children = {child.name : child for child in consolidated.children}
+            for name, group in groups.items():
+                next = children.get(name)
+                if next is None:
+                    next = TreeNode(name)
+                    consolidated.children.append(next)
+                if name not in ignore_nodes: pairs.append((group, next))
+
+        # Add pairs to stack in reverse, so that they are visited in order (children of ignore_nodes are not merged)
+        stack.extend(reversed(pairs))
+
+
+def consolidate(trees : Union[TreeNode, Iterable[TreeNode]], start_node = None, ignore_nodes = None):
+    """
     Consolidate a set of trees into a single tree
     1. The set of complete paths in the consolidated tree is equal to the union of the set of trees in each tree
     2. Every complete path in the consolidated tree is distinct (no two complete paths have the same sequence of nodes)
     * A 'complete path' is a path from root to leaf
+    Trees are merged one at a time (see Consolidation), so trees may be any iterable, such as a generator parsing one file at a time
     """
-    
+
     # Handle arguments
-    if type(trees) == TreeNode: trees = [trees]
-    if ignore_nodes is None: ignore_nodes = []
-
-    # List of trees to consolidate
-    source_trees = []
-    
-    # Start node is given
-    # Get all subtrees rooted at start_node
-    if start_node is not None:
-        for tree in trees:
-            source_trees.extend(tree.walk(start_node))
-            if tree.name == start_node: source_trees.append(tree)
-    
-    # Start node is not given
-    # Assert all trees are rooted at the same node
-    else:
-        start_node = trees[0].name
-        for tree in trees: assert tree.name == start_node
-        source_trees = trees
-    
-    # Consolidate trees
-    return consolidate_helper(source_trees, start_node, ignore_nodes)
-            
-            
-def consolidate_helper(nodes : list[TreeNode], node_name : str, ignore_nodes : list[str]):
-    """
-    Consolidate a set of nodes (helper function for consolidate)
-    1. Create a new node
-    2. Group all children of nodes together that have the same name
-    3. Recursively consolidate each disjoint group of children
-    4. Add each consolidated child as a child of new node
-    """
-    
-    # Initialize consolidated node
-    new = TreeNode(node_name)
-    
-    # Ignore children of current node if it is one of the ignore_nodes
-    if node_name in ignore_nodes:
-        return new
-    
-    # Group children of nodes together that have the same name
-    name_map = dict()
-    for node in nodes:
-        for child in node.children:
-            if child.name not in name_map:
-                name_map[child.name] = [child]
-            else:
-                name_map[child.name].append(child)
-    
-    # Call consolidate helper on each group and add result to children of consolidated node
-    for child_name, children in name_map.items():
-        new.children.append(consolidate_helper(children, child_name, ignore_nodes))
-        
-    return new
\ No newline at end of file
+    if isinstance(trees, TreeNode): trees = [trees]
+
+    # Merge each tree (or each of its subtrees rooted at start_node, if given)
+    consolidation = Consolidation(start_node, ignore_nodes)
+    for tree in trees:
+        consolidation.add_tree(tree)
+
+    return consolidation.root
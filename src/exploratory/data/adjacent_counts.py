@@ -1,6 +1,7 @@
-from typing import Iterable, Mapping, Hashable
+from typing import Iterable, Mapping, Hashable, Optional
 from collections import deque, OrderedDict, Counter
 from utilities.types.tree_node import TreeNode
+from exploratory.basic.symbols import SymbolTable
 
 
 def get_adjacent_counts(trees : Iterable[TreeNode]):
@@ -38,9 +39,10 @@ def get_adjacent_counts(trees : Iterable[TreeNode]):
     return counts
 
 
-def write_adjacent_counts(adj_counts : Mapping[Hashable, tuple[int, int]], data_rootdir : str):
+def write_adjacent_counts(adj_counts : Mapping[Hashable, tuple[int, int]], data_rootdir : str, symbols : Optional[SymbolTable] = None):
     """
     Write adjacent counts to file
+    Nodes are interned codes of symbols if symbols is given
     """
     
     # Open file
@@ -53,6 +55,7 @@ def write_adjacent_counts(adj_counts : Mapping[Hashable, tuple[int, int]], data_
             mn, mx = counts
                 
             # Write min, max counts
+            if symbols is not None: node = symbols.lookup(node)
             entry = "{} {} {}\n".format(node, mn, mx)
             f.write(entry)
     
@@ -60,9 +63,10 @@ def write_adjacent_counts(adj_counts : Mapping[Hashable, tuple[int, int]], data_
     f.close()
     
     
-def read_adjacent_counts(data_rootdir : str):
+def read_adjacent_counts(data_rootdir : str, symbols : Optional[SymbolTable] = None):
     """
     Read adjacent counts from file
+    Nodes are interned with symbols if symbols is given
     """
     
     # Dictionary containing min/max counts
@@ -76,6 +80,7 @@ def read_adjacent_counts(data_rootdir : str):
     
         # Parse line for adjacent count
         node, mn_str, mx_str = line.split(' ')
+        if symbols is not None: node = symbols.intern(node)
         mn = int(mn_str)
         mx = int(mx_str)
         
@@ -88,15 +93,19 @@ def read_adjacent_counts(data_rootdir : str):
     return adj_counts
 
 
-def init_adjacent_counts(trees : Iterable[TreeNode], data_rootdir : str):
+def init_adjacent_counts(trees : Iterable[TreeNode], data_rootdir : str, symbols : Optional[SymbolTable] = None):
     """
     Get and write adjacent counts to file
+    Nodes are interned with symbols if symbols is given
     """
     
     # Get adjacent counts
     adj_counts = get_adjacent_counts(trees)
     
+    # Intern nodes, so adjacent counts are keyed on codes as when they are read
+    if symbols is not None: adj_counts = OrderedDict((symbols.intern(node), counts) for node, counts in adj_counts.items())
+    
     # Write adjacent counts
-    write_adjacent_counts(adj_counts, data_rootdir)
+    write_adjacent_counts(adj_counts, data_rootdir, symbols)
     
-    return adj_counts
\ No newline at end of file
+    return adj_counts
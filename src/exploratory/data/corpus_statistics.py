@@ -0,0 +1,193 @@
+from __future__ import annotations
+from typing import Iterable, MutableMapping, Hashable, Optional
+from collections import OrderedDict, Counter
+import json
+from utilities.types.tree_node import TreeNode
+from exploratory.basic.symbols import SymbolTable
+
+
+def update_min_max(counts : MutableMapping[Hashable, tuple[int, int]], node : Hashable, count : int):
+    """
+    Update the (min, max) counts of node with count
+    """
+    if node not in counts:
+        counts[node] = (count, count)
+    else:
+        mn, mx = counts[node]
+        counts[node] = (min(count, mn), max(count, mx))
+
+
+def merge_min_max(counts : MutableMapping[Hashable, tuple[int, int]], node : Hashable, mn : int, mx : int):
+    """
+    Update the (min, max) counts of node with another (min, max) pair
+    """
+    if node not in counts:
+        counts[node] = (mn, mx)
+    else:
+        prev_mn, prev_mx = counts[node]
+        counts[node] = (min(mn, prev_mn), max(mx, prev_mx))
+
+
+class CorpusStatistics:
+    """
+    Edge counts, adjacent counts and path counts of a corpus of trees, collected in a single DFS per tree
+    Holds the same mappings as get_edge_counts, get_adjacent_counts and get_path_counts:
+        edge_counts     (n1 -> n2 -> (min, max)) number of times n2 is a child of an instance of n1
+        adj_counts      (n -> (min, max)) number of children of an instance of n
+        path_counts     (n -> (min, max)) number of times n appears on a path from root to leaf on which it appears
+    Statistics of disjoint sets of trees (such as repositories) are combined with merge,
+    which is associative, so shards can be collected separately and reduced in any grouping
+    """
+
+    def __init__(self):
+        self.edge_counts : OrderedDict[Hashable, OrderedDict[Hashable, tuple[int, int]]] = OrderedDict()
+        self.adj_counts : OrderedDict[Hashable, tuple[int, int]] = OrderedDict()
+        self.path_counts : OrderedDict[Hashable, tuple[int, int]] = OrderedDict()
+
+    def add_tree(self, tree : TreeNode):
+        """
+        Update statistics with the nodes of tree
+        The number of times each node appears on the path from root is kept on the DFS stack,
+        and at each leaf only the path counts of nodes whose count changed since the previous leaf are updated
+        """
+
+        # Initialize path from root, number of times each node appears on it, and nodes whose number changed since the previous leaf
+        path : list[Hashable] = list()
+        on_path : Counter[Hashable] = Counter()
+        changed : dict[Hashable, None] = dict()
+
+        # Initialize stack
+        stack : list[tuple[int, TreeNode]] = [(0, tree)]
+
+        # DFS
+        while stack:
+
+            # Get (depth, node) pair from stack
+            depth, curr = stack.pop()
+
+            # Backtrack path to depth
+            while len(path) > depth:
+                node = path.pop()
+                on_path[node] -= 1
+                changed[node] = None
+
+            # Add node to path
+            node = curr.name
+            path.append(node)
+            on_path[node] += 1
+            changed[node] = None
+
+            # Update adjacent counts
+            children = curr.children
+            update_min_max(self.adj_counts, node, len(children))
+
+            # Update edge counts with the number of times each node is a child
+            edge_counts = self.edge_counts.get(node)
+            if edge_counts is None:
+                edge_counts = self.edge_counts[node] = OrderedDict()
+            if len(children) == 1:
+                update_min_max(edge_counts, children[0].name, 1)
+            elif children:
+                for child, count in Counter(child.name for child in children).items():
+                    update_min_max(edge_counts, child, count)
+
+            # Node is a leaf, update path counts of each node on path whose count changed
+            if not children:
+                for changed_node in changed:
+                    if on_path[changed_node] > 0:
+                        update_min_max(self.path_counts, changed_node, on_path[changed_node])
+                changed.clear()
+
+            # Add children to stack
+            stack.extend((depth + 1, child) for child in children)
+
+
+    def merge(self, other : CorpusStatistics) -> CorpusStatistics:
+        """
+        Combine statistics of other into statistics, as if the trees of other had been added
+        """
+
+        # Merge edge counts, keeping entries of nodes without children
+        for node1, node_counts in other.edge_counts.items():
+            edge_counts = self.edge_counts.get(node1)
+            if edge_counts is None:
+                edge_counts = self.edge_counts[node1] = OrderedDict()
+            for node2, (mn, mx) in node_counts.items():
+                merge_min_max(edge_counts, node2, mn, mx)
+
+        # Merge adjacent counts and path counts
+        for node, (mn, mx) in other.adj_counts.items():
+            merge_min_max(self.adj_counts, node, mn, mx)
+        for node, (mn, mx) in other.path_counts.items():
+            merge_min_max(self.path_counts, node, mn, mx)
+
+        return self
+
+    def diff(self, other : CorpusStatistics) -> list[Hashable]:
+        """
+        Get the nodes whose children or adjacent counts differ from those of other (the nodes whose class may have changed, see update_node_classes),
+        in order of edge counts followed by the nodes only in other
+        """
+        nodes = [node for node, node_counts in self.edge_counts.items() if node not in other.edge_counts or list(node_counts) != list(other.edge_counts[node]) or self.adj_counts.get(node) != other.adj_counts.get(node)]
+        nodes.extend(node for node in other.edge_counts if node not in self.edge_counts)
+        return nodes
+
+    def intern(self, symbols : SymbolTable) -> CorpusStatistics:
+        """
+        Get statistics with each node replaced by its interned code in symbols
+        """
+        statistics = CorpusStatistics()
+        for node1, node_counts in self.edge_counts.items():
+            statistics.edge_counts[symbols.intern(node1)] = OrderedDict((symbols.intern(node2), counts) for node2, counts in node_counts.items())
+        statistics.adj_counts = OrderedDict((symbols.intern(node), counts) for node, counts in self.adj_counts.items())
+        statistics.path_counts = OrderedDict((symbols.intern(node), counts) for node, counts in self.path_counts.items())
+        return statistics
+
+    def to_json(self) -> dict:
+
+        # Lists of (node, min, max) triples, with (node1, list of (node2, min, max) triples) pairs for edge counts
+        return {
+            "edge_counts" : [(node1, [(node2, mn, mx) for node2, (mn, mx) in node_counts.items()]) for node1, node_counts in self.edge_counts.items()],
+            "adj_counts" : [(node, mn, mx) for node, (mn, mx) in self.adj_counts.items()],
+            "path_counts" : [(node, mn, mx) for node, (mn, mx) in self.path_counts.items()],
+        }
+
+    @classmethod
+    def from_json(cls, data : dict) -> CorpusStatistics:
+
+        # Build mappings from lists of triples
+        statistics = cls()
+        for node1, node_counts in data["edge_counts"]:
+            statistics.edge_counts[node1] = OrderedDict((node2, (mn, mx)) for node2, mn, mx in node_counts)
+        statistics.adj_counts = OrderedDict((node, (mn, mx)) for node, mn, mx in data["adj_counts"])
+        statistics.path_counts = OrderedDict((node, (mn, mx)) for node, mn, mx in data["path_counts"])
+        return statistics
+
+    def save(self, filepath : str):
+
+        # Write statistics to file
+        f = open(filepath, 'w')
+        json.dump(self.to_json(), f)
+        f.close()
+
+    @classmethod
+    def load(cls, filepath : str) -> CorpusStatistics:
+
+        # Read statistics from file
+        f = open(filepath, 'r')
+        statistics = cls.from_json(json.load(f))
+        f.close()
+        return statistics
+
+
+def get_statistics(trees : Iterable[TreeNode]) -> CorpusStatistics:
+    """
+    Get edge counts, adjacent counts and path counts of trees in a single DFS per tree
+    """
+
+    # Add each tree to statistics
+    statistics = CorpusStatistics()
+    for tree in trees:
+        statistics.add_tree(tree)
+
+    return statistics
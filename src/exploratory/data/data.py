@@ -1,8 +1,17 @@
-from edge_counts import init_edge_counts
-from adjacent_counts import init_adjacent_counts
-from path_counts import init_path_counts
-from node_classes import init_node_classes
-from exploratory.tools.files import get_sources
+from edge_counts import write_edge_counts
+from adjacent_counts import write_adjacent_counts
+from path_counts import write_path_counts
+from corpus_statistics import CorpusStatistics, get_statistics
+from node_classes import init_node_classes, update_node_classes, write_node_class_changes
+from store import StatisticsStore
+from exploratory.tools.files import get_sources, get_files_hash
+from exploratory.basic.symbols import SymbolTable
+from exploratory.basic.recursion import init_recursion
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+from collections import OrderedDict
+import json
+import os
 
 def get_trees(filepaths : list[str]):
     """
@@ -15,30 +24,113 @@ def get_trees(filepaths : list[str]):
     return trees
 
 
-def init_data(src_rootdir : str, data_rootdir : str):
+def get_shard_statistics(repository : str):
     """
-    Initialize data parsed from source files
+    Get edge counts, adjacent counts and path counts of the source files of a repository
+    """
+    
+    # Get statistics of trees parsed from each source file in repository
+    return get_statistics(get_trees(get_sources(repository)))
+
+
+def get_corpus_statistics(src_rootdir : str, shard_rootdir : str, n_workers : Optional[int] = None):
+    """
+    Get statistics of each repository (subdirectory of src_rootdir) and merge them in order
+    The statistics of each repository are saved under shard_rootdir with a hash of its sources,
+    and are only recomputed, in a pool of worker processes, for repositories whose sources changed since they were saved
     """
     
-    # Get source files
-    filepaths = get_sources(src_rootdir)
+    # Get repositories and the hash of their sources
+    repositories = sorted(entry.path for entry in os.scandir(src_rootdir) if entry.is_dir())
+    hashes = {repository : get_files_hash(get_sources(repository), repository) for repository in repositories}
+    
+    # Read hashes of saved shards
+    os.makedirs(shard_rootdir, exist_ok=True)
+    manifest_path = shard_rootdir + '/' + "manifest.json"
+    manifest = dict()
+    if os.path.exists(manifest_path):
+        f = open(manifest_path, 'r')
+        manifest = json.load(f)
+        f.close()
+    
+    # Get filepath of the saved shard of each repository
+    shard_paths = {repository : shard_rootdir + '/' + os.path.basename(repository) + ".json" for repository in repositories}
+    
+    # Recompute statistics of changed repositories in worker processes
+    changed = [repository for repository in repositories if manifest.get(repository) != hashes[repository] or not os.path.exists(shard_paths[repository])]
+    if changed:
+        with ProcessPoolExecutor(n_workers) as pool:
+            for repository, statistics in zip(changed, pool.map(get_shard_statistics, changed)):
+                statistics.save(shard_paths[repository])
+                manifest[repository] = hashes[repository]
+    
+    # Write hashes of saved shards
+    f = open(manifest_path, 'w')
+    json.dump(manifest, f)
+    f.close()
+    
+    # Merge statistics of each repository
+    statistics = CorpusStatistics()
+    for repository in repositories:
+        statistics.merge(CorpusStatistics.load(shard_paths[repository]))
+        
+    return statistics
+
+
+def init_data(src_rootdir : str, data_rootdir : str, symbols : Optional[SymbolTable] = None, n_workers : Optional[int] = None):
+    """
+    Initialize data parsed from source files
+    If symbols is given, nodes are interned codes of symbols and the symbol table is saved alongside the data
+    Statistics are collected per repository in a pool of n_workers processes, reusing the saved statistics of unchanged repositories
+    Node classes are only recomputed for nodes whose children or adjacent counts changed since the data was last initialized
+    Return edge counts, adjacent counts, path counts, a mapping of each changed node class to its parameters (or None if it was removed),
+    and the kind of recursion of each node
+    """
     
-    # Generate trees
-    trees = get_trees(filepaths)
+    # Get edge counts, adjacent counts and path counts of each repository, and merge them
+    statistics = get_corpus_statistics(src_rootdir, data_rootdir + '/' + "shards", n_workers)
+    if symbols is not None: statistics = statistics.intern(symbols)
+    edge_counts, adj_counts, path_counts = statistics.edge_counts, statistics.adj_counts, statistics.path_counts
     
-    # Get and write edge counts to file
-    edge_counts = init_edge_counts(trees, data_rootdir)
+    # Write edge counts, adjacent counts and path counts to file
+    write_edge_counts(edge_counts, data_rootdir, symbols)
+    write_adjacent_counts(adj_counts, data_rootdir, symbols)
+    write_path_counts(path_counts, data_rootdir, symbols)
     
-    # Get and write adjacent counts to file
-    adj_counts = init_adjacent_counts(trees, data_rootdir)
+    # Get and write kind of recursion of each node, from the graph of nodes adjacent to each node in edge counts
+    recursion = init_recursion(edge_counts, data_rootdir, symbols)
     
-    # Get and write path counts to file
-    path_counts = init_path_counts(trees, data_rootdir)
+    # Open store
+    with StatisticsStore(data_rootdir + '/' + "statistics.db") as store:
+        
+        # Read statistics and node classes of the previous initialization
+        previous = CorpusStatistics()
+        previous.edge_counts = store.read_edge_counts(symbols)
+        previous.adj_counts = store.read_adjacent_counts(symbols)
+        node_classes = store.read_node_classes(symbols)
+        
+        # Update node classes of changed nodes, and rewrite only the changed classes in file
+        if node_classes:
+            node_classes, changes = update_node_classes(node_classes, edge_counts, adj_counts, statistics.diff(previous))
+            if changes: write_node_class_changes(changes, data_rootdir, symbols)
+            store.update_node_classes(changes, symbols)
+        
+        # Get and write node class parameters and node class declarations to file
+        else:
+            node_classes = init_node_classes(edge_counts, adj_counts, data_rootdir, symbols)
+            changes = OrderedDict((params[0], params) for params in node_classes)
+            store.write_node_classes(node_classes, symbols)
+        
+        # Write edge counts, adjacent counts and path counts to store
+        store.write_edge_counts(edge_counts, symbols)
+        store.write_adjacent_counts(adj_counts, symbols)
+        store.write_path_counts(path_counts, symbols)
     
-    # Get and write node class parameters and node class declarations to file
-    node_classes = init_node_classes(edge_counts, adj_counts, data_rootdir)
+    # Write symbol table to file
+    if symbols is not None:
+        symbols.save(data_rootdir + '/' + "symbols.txt")
 
-    return edge_counts, adj_counts, path_counts
+    return edge_counts, adj_counts, path_counts, changes, recursion
     
     
 if __name__ == "__main__":
@@ -46,4 +138,4 @@ if __name__ == "__main__":
     # Initialize data
     src_rootdir = "codes"
     data_rootdir = "data"
-    init_data(src_rootdir, data_rootdir)
\ No newline at end of file
+    init_data(src_rootdir, data_rootdir)
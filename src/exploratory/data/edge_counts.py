@@ -1,6 +1,7 @@
-from typing import Iterable, Mapping, Hashable
+from typing import Iterable, Mapping, Hashable, Optional
 from collections import deque, OrderedDict, Counter
 from utilities.types.tree_node import TreeNode
+from exploratory.basic.symbols import SymbolTable
 
 
 def get_edge_counts(trees : Iterable[TreeNode]):
@@ -33,13 +34,13 @@ def get_edge_counts(trees : Iterable[TreeNode]):
         for next in curr.children:
             
             # Increment count
-            temp_counts(next)
+            temp_counts[next.name] += 1
             
             # Add child to stack
             stack.append(next)
             
         # Update counts
-        for node, count in temp_counts.total():
+        for node, count in temp_counts.items():
             if node not in counts[curr.name]: 
                 counts[curr.name][node] = (count, count)
             else: 
@@ -49,9 +50,10 @@ def get_edge_counts(trees : Iterable[TreeNode]):
     return counts
 
 
-def write_edge_counts(edge_counts : Mapping[Hashable, Mapping[str, tuple[int, int]]], data_rootdir : str):
+def write_edge_counts(edge_counts : Mapping[Hashable, Mapping[str, tuple[int, int]]], data_rootdir : str, symbols : Optional[SymbolTable] = None):
     """
     Write edge counts to file
+    Nodes are interned codes of symbols if symbols is given
     """
     
     # Open file
@@ -65,16 +67,18 @@ def write_edge_counts(edge_counts : Mapping[Hashable, Mapping[str, tuple[int, in
             mn, mx = counts
                 
             # Write min, max counts
-            entry = "{} {} {} {}\n".format(node1, node2, mn, mx)
+            id1, id2 = (symbols.lookup(node1), symbols.lookup(node2)) if symbols is not None else (node1, node2)
+            entry = "{} {} {} {}\n".format(id1, id2, mn, mx)
             f.write(entry)
     
     # Close file
     f.close()
 
 
-def read_edge_counts(data_rootdir : str):
+def read_edge_counts(data_rootdir : str, symbols : Optional[SymbolTable] = None):
     """
     Read edge counts from file
+    Nodes are interned with symbols if symbols is given
     """
     
     # Dictionary containing min/max counts
@@ -88,6 +92,7 @@ def read_edge_counts(data_rootdir : str):
     
         # Parse line for edge count
         node1, node2, mn_str, mx_str = line.split(' ')
+        if symbols is not None: node1, node2 = symbols.intern(node1), symbols.intern(node2)
         mn = int(mn_str)
         mx = int(mx_str)
         
@@ -102,9 +107,10 @@ def read_edge_counts(data_rootdir : str):
     return edge_counts
 
 
-def read_edges(data_rootdir : str):
+def read_edges(data_rootdir : str, symbols : Optional[SymbolTable] = None):
     """
     Read edges from file
+    Nodes are interned with symbols if symbols is given
     """
     
     # Dictionary containing edge lists
@@ -118,6 +124,7 @@ def read_edges(data_rootdir : str):
     
         # Parse line for edge
         node1, node2, _, _ = line.split(' ')
+        if symbols is not None: node1, node2 = symbols.intern(node1), symbols.intern(node2)
         
         # Add edge to dict
         if node1 not in edge_lists:
@@ -131,15 +138,20 @@ def read_edges(data_rootdir : str):
     return edge_lists
 
 
-def init_edge_counts(trees : Iterable[TreeNode], data_rootdir : str):
+def init_edge_counts(trees : Iterable[TreeNode], data_rootdir : str, symbols : Optional[SymbolTable] = None):
     """
     Get and write edge counts to file
+    Nodes are interned with symbols if symbols is given
     """
     
     # Get edge counts
     edge_counts = get_edge_counts(trees)
     
+    # Intern nodes, so edge counts are keyed on codes as when they are read
+    if symbols is not None:
+        edge_counts = OrderedDict((symbols.intern(node1), OrderedDict((symbols.intern(node2), counts) for node2, counts in node_counts.items())) for node1, node_counts in edge_counts.items())
+    
     # Write edge counts
-    write_edge_counts(edge_counts, data_rootdir)
+    write_edge_counts(edge_counts, data_rootdir, symbols)
     
-    return edge_counts
\ No newline at end of file
+    return edge_counts
@@ -1,7 +1,10 @@
-from typing import Iterable, Mapping
+from typing import Iterable, Mapping, Hashable, Optional
+from collections import OrderedDict
+from exploratory.basic.symbols import SymbolTable
+import os
 
 # Node class declaration format string
-CLASS_DECLARATION = "type('{node}', ({cls},), {'__init__' : constructor({neighbors})})\n"
+CLASS_DECLARATION = "type('{node}', ({cls},), {{'__init__' : constructor({neighbors})}})\n"
 
 # Node superclasses
 leafnode_supercls = "LeafNode"
@@ -9,6 +12,32 @@ multinode_supercls = "MultiNode"
 selectornode_supercls = "SelectorNode"
 
 
+def get_node_class(node : str, edge_counts : Mapping[str, Mapping[str, tuple[int, int]]], adj_counts : Mapping[str, tuple[int, int]]):
+    """
+    Get name of class, name of superclass and list of all possible adjacent nodes of node (see get_node_classes)
+    """
+    
+    # Get list and counts of all adjacent nodes
+    neighbors = [neighbor for neighbor in edge_counts[node]]
+    
+    # Minimum and maximum number of adjacent nodes for any one instance of node
+    mn_count, mx_count = adj_counts[node]
+    
+    # Node is a LeafNode (no instance of node has children)
+    if not neighbors:
+        supercls = leafnode_supercls
+        
+    # Node is a MultiNode (node either has a variable number of children or a static number of children that is greater than 1)
+    elif mn_count != mx_count or mn_count != 1:
+        supercls = multinode_supercls
+            
+    # Node is a SelectorNode (every instance of node has 1 child)
+    else:
+        supercls = selectornode_supercls
+    
+    return (node, supercls, neighbors)
+
+
 def get_node_classes(edge_counts : Mapping[str, Mapping[str, tuple[int, int]]], adj_counts : Mapping[str, tuple[int, int]]):
     """
     For each distinct node n, get the following:
@@ -25,33 +54,66 @@ def get_node_classes(edge_counts : Mapping[str, Mapping[str, tuple[int, int]]],
     # Iterate over each node in reverse order
     for node in reversed(edge_counts):
         
-        # Get list and counts of all adjacent nodes
-        neighbors = [neighbor for neighbor in edge_counts[node]]
+        # Add class declaration parameters
+        node_classes.append(get_node_class(node, edge_counts, adj_counts))
+            
+    return node_classes
+
+
+def update_node_classes(node_classes : Iterable[tuple[str, str, list[str]]], edge_counts : Mapping[str, Mapping[str, tuple[int, int]]], adj_counts : Mapping[str, tuple[int, int]], nodes : Iterable[str]):
+    """
+    Update node class parameters given the nodes whose edge counts or adjacent counts changed (see CorpusStatistics.diff)
+    Only the classes of nodes are recomputed:
+    1. Classes of nodes no longer in edge_counts are removed
+    2. Classes of nodes whose superclass or neighbors changed are replaced in place
+    3. Classes of new nodes are added to the front of the list, in reverse order of edge_counts as in get_node_classes
+    Return the updated list of tuples, and a mapping of each changed class to its new parameters (or None if it was removed), 
+    with new classes in list order
+    """
+    
+    # Index of the parameters of each class
+    node_classes = list(node_classes)
+    index = {params[0] : i for i, params in enumerate(node_classes)}
+    
+    # Changed and new class parameters
+    changes = OrderedDict()
+    new_classes = list()
+    
+    # Iterate over each changed node
+    for node in nodes:
+        i = index.get(node)
         
-        # Minimum and maximum number of adjacent nodes for any one instance of node
-        mn_count, mx_count = adj_counts[node]
+        # Node was removed
+        if node not in edge_counts:
+            if i is not None:
+                node_classes[i] = None
+                changes[node] = None
+            continue
         
-        # Node is a LeafNode (no instance of node has children)
-        if not neighbors:
-            supercls = leafnode_supercls
-            
-        # Node is a MultiNode (node either has a variable number of children or a static number of children that is greater than 1)
-        elif mn_count != mx_count or mn_count != 1:
-            supercls = multinode_supercls
-                
-        # Node is a SelectorNode (every instance of node has 1 child)
-        else:
-            supercls = selectornode_supercls
+        # Get class parameters of node
+        params = get_node_class(node, edge_counts, adj_counts)
         
-        # Add class declaration parameters
-        node_classes.append((node, supercls, neighbors))    
+        # Node is new
+        if i is None:
+            new_classes.append(params)
             
-    return node_classes
+        # Class of node changed
+        elif node_classes[i] != params:
+            node_classes[i] = params
+            changes[node] = params
+    
+    # Add new classes in reverse order of edge_counts
+    position = {node : i for i, node in enumerate(edge_counts)} if len(new_classes) > 1 else dict()
+    new_classes.sort(key=lambda params : position.get(params[0], 0), reverse=True)
+    changes.update((params[0], params) for params in new_classes)
+    
+    return new_classes + [params for params in node_classes if params is not None], changes
 
     
-def write_node_classes(node_classes : Iterable[tuple[str, str, Iterable[str]]], data_rootdir : str):
+def write_node_classes(node_classes : Iterable[tuple[str, str, Iterable[str]]], data_rootdir : str, symbols : Optional[SymbolTable] = None):
     """
     Write node class parameters and node class declarations to file
+    Nodes are interned codes of symbols if symbols is given
     """
     
     # Open files
@@ -61,15 +123,9 @@ def write_node_classes(node_classes : Iterable[tuple[str, str, Iterable[str]]],
     # Iterate over each set of class declaration parameters
     for node, supercls, neighbors in node_classes:
         
-        # Comma separated neighbors
-        neighbors_str = ', '.join(neighbors)
-        
-        # Write class parameters
-        cls_param = "{} {} ({})\n".format(node, supercls, neighbors_str)
+        # Write class parameters and class declaration
+        cls_param, cls_decl = format_node_class(node, supercls, neighbors, symbols)
         param_f.write(cls_param)
-        
-        # Write class declaration
-        cls_decl = CLASS_DECLARATION.format(node=node, cls=supercls, neighbors=neighbors_str)
         decl_f.write(cls_decl)
     
     # Close files
@@ -77,13 +133,76 @@ def write_node_classes(node_classes : Iterable[tuple[str, str, Iterable[str]]],
     decl_f.close()
     
     
-def read_node_classes(data_rootdir : str):
+def format_node_class(node : Hashable, supercls : str, neighbors : Iterable[Hashable], symbols : Optional[SymbolTable] = None) -> tuple[str, str]:
+    """
+    Get the lines of node class parameters and node class declaration of a node class
+    Nodes are interned codes of symbols if symbols is given
+    """
+    
+    # Get ids of interned nodes
+    if symbols is not None:
+        node = symbols.lookup(node)
+        neighbors = [symbols.lookup(neighbor) for neighbor in neighbors]
+    
+    # Comma separated neighbors
+    neighbors_str = ', '.join(neighbors)
+    
+    # Class parameters and class declaration
+    return "{} {} ({})\n".format(node, supercls, neighbors_str), CLASS_DECLARATION.format(node=node, cls=supercls, neighbors=neighbors_str)
+
+
+def write_node_class_changes(changes : Mapping[Hashable, Optional[tuple[Hashable, str, Iterable[Hashable]]]], data_rootdir : str, symbols : Optional[SymbolTable] = None):
+    """
+    Rewrite only the node classes in changes (see update_node_classes) in the node class parameters and node class declarations files
+    The lines of unchanged classes are copied without being parsed beyond their node,
+    changed classes are replaced in place, classes mapped to None are removed, and new classes are written first, in the order of changes
+    Nodes are interned codes of symbols if symbols is given
+    """
+    
+    # Changes by id of node
+    changes = OrderedDict((symbols.lookup(node) if symbols is not None else node, params) for node, params in changes.items())
+    
+    # Open files and files replacing them
+    param_filepath = data_rootdir + '/' + "node_class_parameters.txt"
+    decl_filepath = data_rootdir + '/' + "node_class_declarations.txt"
+    param_f, decl_f = open(param_filepath, 'r'), open(decl_filepath, 'r')
+    lines = [(line, decl) for line, decl in zip(param_f, decl_f)]
+    param_f.close()
+    decl_f.close()
+    new_param_f, new_decl_f = open(param_filepath + ".tmp", 'w'), open(decl_filepath + ".tmp", 'w')
+    
+    # Write new classes (classes in changes whose node has no line)
+    existing = {line[: line.index(' ')] for line, _ in lines}
+    for node, params in changes.items():
+        if params is not None and node not in existing:
+            param_line, decl_line = format_node_class(*params, symbols)
+            new_param_f.write(param_line)
+            new_decl_f.write(decl_line)
+    
+    # Copy the lines of each unchanged class, and replace or remove the lines of each changed class
+    for param_line, decl_line in lines:
+        node = param_line[: param_line.index(' ')]
+        if node in changes:
+            if changes[node] is None: continue
+            param_line, decl_line = format_node_class(*changes[node], symbols)
+        new_param_f.write(param_line)
+        new_decl_f.write(decl_line)
+    
+    # Close files and replace files
+    new_param_f.close()
+    new_decl_f.close()
+    os.replace(param_filepath + ".tmp", param_filepath)
+    os.replace(decl_filepath + ".tmp", decl_filepath)
+    
+    
+def read_node_classes(data_rootdir : str, symbols : Optional[SymbolTable] = None):
     """
     Read node class parameters from file
+    Nodes are interned with symbols if symbols is given
     """
     
     # List of node class parameters
-    path_counts = list()
+    node_classes = list()
     
     # Open file
     f = open(data_rootdir + '/' + "node_class_parameters.txt", 'r')
@@ -93,22 +212,32 @@ def read_node_classes(data_rootdir : str):
     
         # Parse line for class parameters
         prefix, postfix = line.split('(')
-        node, supercls = prefix.split(' ')
-        neighbors = postfix[:-1].split(', ')
+        node, supercls = prefix.rstrip(' ').split(' ')
+        neighbors_str = postfix.rstrip('\n')[:-1]
+        neighbors = neighbors_str.split(', ') if neighbors_str else []
+        if symbols is not None:
+            node = symbols.intern(node)
+            neighbors = [symbols.intern(neighbor) for neighbor in neighbors]
         
         # Add parameters to list
-        path_counts.append((node, supercls, neighbors))
+        node_classes.append((node, supercls, neighbors))
+    
+    # Close file
+    f.close()
+    
+    return node_classes
 
 
-def init_edge_counts(edge_counts : Mapping[str, Mapping[str, tuple[int, int]]], adj_counts : Mapping[str, tuple[int, int]], data_rootdir : str):
+def init_node_classes(edge_counts : Mapping[str, Mapping[str, tuple[int, int]]], adj_counts : Mapping[str, tuple[int, int]], data_rootdir : str, symbols : Optional[SymbolTable] = None):
     """
     Get and write node class parameters and node class declarations to file
+    Nodes of edge counts and adjacent counts must be interned codes of symbols if symbols is given (see init_edge_counts)
     """
     
     # Get node class parameters
     node_classes = get_node_classes(edge_counts, adj_counts)
     
     # Write node class parameters and node class declarations to file
-    write_node_classes(node_classes, data_rootdir)
+    write_node_classes(node_classes, data_rootdir, symbols)
     
-    return node_classes
\ No newline at end of file
+    return node_classes
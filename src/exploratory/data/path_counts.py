@@ -1,6 +1,7 @@
-from typing import Iterable, Mapping, Hashable
+from typing import Iterable, Mapping, Hashable, Optional
 from collections import OrderedDict, Counter
 from utilities.types.tree_node import TreeNode
+from exploratory.basic.symbols import SymbolTable
 from exploratory.tools import enumerate_tree_paths
 
 def get_path_counts(trees : Iterable[TreeNode]):
@@ -38,9 +39,10 @@ def get_path_counts(trees : Iterable[TreeNode]):
     return path_counts
 
 
-def write_path_counts(path_counts : Mapping[Hashable, tuple[int, int]], data_rootdir : str):
+def write_path_counts(path_counts : Mapping[Hashable, tuple[int, int]], data_rootdir : str, symbols : Optional[SymbolTable] = None):
     """
     Write path counts to file
+    Nodes are interned codes of symbols if symbols is given
     """
     
     # Open file
@@ -53,6 +55,7 @@ def write_path_counts(path_counts : Mapping[Hashable, tuple[int, int]], data_roo
             mn, mx = counts
                 
             # Write min, max counts
+            if symbols is not None: node = symbols.lookup(node)
             entry = "{} {} {}\n".format(node, mn, mx)
             f.write(entry)
     
@@ -60,9 +63,10 @@ def write_path_counts(path_counts : Mapping[Hashable, tuple[int, int]], data_roo
     f.close()
 
 
-def read_path_counts(data_rootdir : str):
+def read_path_counts(data_rootdir : str, symbols : Optional[SymbolTable] = None):
     """
     Read path counts from file
+    Nodes are interned with symbols if symbols is given
     """
     
     # List of nodes and dictionary containing min/max counts
@@ -75,24 +79,33 @@ def read_path_counts(data_rootdir : str):
     for line in f.readlines():
     
         # Parse line for path count
-        node, mn, mx = line.split(' ')
+        node, mn_str, mx_str = line.split(' ')
+        if symbols is not None: node = symbols.intern(node)
+        mn = int(mn_str)
+        mx = int(mx_str)
         
-        # Add adjacency to dict
+        # Add path count to dict
         path_counts[node] = (mn, mx)
     
     # Close file
     f.close()
     
+    return path_counts
+    
     
-def init_path_counts(trees : Iterable[TreeNode], data_rootdir : str):
+def init_path_counts(trees : Iterable[TreeNode], data_rootdir : str, symbols : Optional[SymbolTable] = None):
     """
     Get and write path counts to file
+    Nodes are interned with symbols if symbols is given
     """
     
     # Get path counts
     path_counts = get_path_counts(trees)
     
+    # Intern nodes, so path counts are keyed on codes as when they are read
+    if symbols is not None: path_counts = OrderedDict((symbols.intern(node), counts) for node, counts in path_counts.items())
+    
     # Write path counts
-    write_path_counts(path_counts, data_rootdir)
+    write_path_counts(path_counts, data_rootdir, symbols)
     
-    return path_counts
\ No newline at end of file
+    return path_counts
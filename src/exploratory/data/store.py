@@ -0,0 +1,220 @@
+from __future__ import annotations
+from typing import Callable, Iterable, Iterator, Mapping, Hashable, Optional
+from collections import OrderedDict
+from array import array
+import sqlite3
+from exploratory.basic.symbols import SymbolTable
+
+
+# Tables of the store
+# Each node id is stored once in nodes, and referred to by its integer code in the other tables
+# Each other table has one row per node, indexed on node, and keeps its rows in the order they were written by position
+# Edges and neighbors of a node are packed into a single blob of unsigned 32-bit integers
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS nodes (code INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS edge_counts (position INTEGER PRIMARY KEY, node INTEGER NOT NULL UNIQUE, edges BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS adjacent_counts (position INTEGER PRIMARY KEY, node INTEGER NOT NULL UNIQUE, mn INTEGER NOT NULL, mx INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS path_counts (position INTEGER PRIMARY KEY, node INTEGER NOT NULL UNIQUE, mn INTEGER NOT NULL, mx INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS node_classes (position INTEGER PRIMARY KEY, node INTEGER NOT NULL UNIQUE, supercls TEXT NOT NULL, neighbors BLOB NOT NULL);
+"""
+
+
+class PackedEdgeCounts(Mapping):
+    """
+    Edge counts read from a store, keeping the packed edges of each node and decoding them on first access
+    Reading the whole table only creates one entry per node, and the edges of nodes that are never accessed are never decoded
+    """
+
+    def __init__(self, rows : OrderedDict[Hashable, bytes], decode : Callable[[int], Hashable]):
+        self.rows : OrderedDict[Hashable, bytes] = rows
+        self.decode : Callable[[int], Hashable] = decode
+        self.decoded : dict[Hashable, OrderedDict[Hashable, tuple[int, int]]] = dict()
+
+    def __getitem__(self, node : Hashable) -> OrderedDict[Hashable, tuple[int, int]]:
+        node_counts = self.decoded.get(node)
+        if node_counts is None:
+            edges = array('I')
+            edges.frombytes(self.rows[node])
+            node_counts = self.decoded[node] = OrderedDict(zip(map(self.decode, edges[0::3]), zip(edges[1::3], edges[2::3])))
+        return node_counts
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self.rows)
+
+    def __reversed__(self) -> Iterator[Hashable]:
+        return reversed(self.rows)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __contains__(self, node : Hashable) -> bool:
+        return node in self.rows
+
+
+class StatisticsStore:
+    """
+    SQLite database holding edge counts, adjacent counts, path counts and node classes, indexed on node id
+    Replaces the text files of write_edge_counts, write_adjacent_counts, write_path_counts and write_node_classes:
+    each table is written in a single transaction and read back in the order it was written,
+    and the row of a single node can be read without reading the rest of its table
+    Nodes are interned codes of symbols (on write and read) if symbols is given, as for the text files
+    Unlike edge_counts.txt, edge counts keep the entries of nodes without children
+    """
+
+    def __init__(self, filepath : str):
+        self.filepath : str = filepath
+        self.connection : sqlite3.Connection = sqlite3.connect(filepath)
+        self.connection.executescript(SCHEMA)
+
+        # Node ids in order of their code, and code of each node id, read on first use
+        self.ids : Optional[list[str]] = None
+        self.codes : Optional[dict[str, int]] = None
+
+    def __enter__(self) -> StatisticsStore:
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def load_nodes(self):
+        """
+        Read node ids in order of their code
+        """
+        self.ids = [id for id, in self.connection.execute("SELECT id FROM nodes ORDER BY code")]
+        self.codes = {id : code for code, id in enumerate(self.ids)}
+
+    def encode(self, node : Hashable, symbols : Optional[SymbolTable]) -> int:
+        """
+        Get the code of the id of node, assigning it a new code if it is not stored yet
+        """
+        id = symbols.lookup(node) if symbols is not None else node
+        code = self.codes.get(id)
+        if code is None:
+            code = self.codes[id] = len(self.ids)
+            self.ids.append(id)
+        return code
+
+    def decoder(self, symbols : Optional[SymbolTable], node : Optional[Hashable]) -> Callable[[int], Hashable]:
+        """
+        Get the function mapping each code to its node, interned with symbols if symbols is given
+        Every id is interned up front when reading a whole table, and only the ids of the row read otherwise
+        """
+        if self.ids is None: self.load_nodes()
+        if symbols is None: return self.ids.__getitem__
+        if node is None: return [symbols.intern(id) for id in self.ids].__getitem__
+        return lambda code : symbols.intern(self.ids[code])
+
+    def replace(self, table : str, rows : Iterable[tuple], n_columns : int):
+        """
+        Replace the rows of table with rows (without their position) in a single transaction
+        """
+        if self.codes is None: self.load_nodes()
+        n_nodes = len(self.ids)
+        statement = "INSERT INTO {} VALUES ({})".format(table, ", ".join("?" * n_columns))
+        with self.connection:
+            self.connection.execute("DELETE FROM {}".format(table))
+            self.connection.executemany(statement, ((position,) + row for position, row in enumerate(rows)))
+
+            # Add ids assigned a code while encoding rows
+            self.connection.executemany("INSERT INTO nodes VALUES (?, ?)", ((code, self.ids[code]) for code in range(n_nodes, len(self.ids))))
+
+    def select(self, table : str, columns : str, node : Optional[Hashable], symbols : Optional[SymbolTable]) -> Iterator[tuple]:
+        """
+        Get the rows of table in the order they were written, or only the row of node if node is given
+        """
+        if node is None:
+            return self.connection.execute("SELECT {} FROM {} ORDER BY position".format(columns, table))
+        if self.codes is None: self.load_nodes()
+        code = self.codes.get(symbols.lookup(node) if symbols is not None else node)
+        if code is None: return iter(())
+        return self.connection.execute("SELECT {} FROM {} WHERE node = ?".format(columns, table), (code,))
+
+    def write_edge_counts(self, edge_counts : Mapping[Hashable, Mapping[Hashable, tuple[int, int]]], symbols : Optional[SymbolTable] = None):
+
+        # One row per node, with its edges packed as (node2, min, max) triples
+        encode = self.encode
+        def rows():
+            for node1, node_counts in edge_counts.items():
+                edges = array('I', [value for node2, (mn, mx) in node_counts.items() for value in (encode(node2, symbols), mn, mx)])
+                yield (encode(node1, symbols), edges.tobytes())
+
+        self.replace("edge_counts", rows(), 3)
+
+    def read_edge_counts(self, symbols : Optional[SymbolTable] = None, node : Optional[Hashable] = None) -> PackedEdgeCounts:
+        """
+        Read edge counts, or only the edge counts of node if node is given
+        The edges of each node are decoded when they are first accessed
+        """
+        decode = self.decoder(symbols, node)
+        return PackedEdgeCounts(OrderedDict((decode(code), blob) for code, blob in self.select("edge_counts", "node, edges", node, symbols)), decode)
+
+    def write_counts(self, table : str, counts : Mapping[Hashable, tuple[int, int]], symbols : Optional[SymbolTable]):
+        self.replace(table, ((self.encode(node, symbols), mn, mx) for node, (mn, mx) in counts.items()), 4)
+
+    def read_counts(self, table : str, symbols : Optional[SymbolTable], node : Optional[Hashable]) -> OrderedDict[Hashable, tuple[int, int]]:
+        decode = self.decoder(symbols, node)
+        return OrderedDict((decode(code), (mn, mx)) for code, mn, mx in self.select(table, "node, mn, mx", node, symbols))
+
+    def write_adjacent_counts(self, adj_counts : Mapping[Hashable, tuple[int, int]], symbols : Optional[SymbolTable] = None):
+        self.write_counts("adjacent_counts", adj_counts, symbols)
+
+    def read_adjacent_counts(self, symbols : Optional[SymbolTable] = None, node : Optional[Hashable] = None) -> OrderedDict[Hashable, tuple[int, int]]:
+        """
+        Read adjacent counts, or only the adjacent counts of node if node is given
+        """
+        return self.read_counts("adjacent_counts", symbols, node)
+
+    def write_path_counts(self, path_counts : Mapping[Hashable, tuple[int, int]], symbols : Optional[SymbolTable] = None):
+        self.write_counts("path_counts", path_counts, symbols)
+
+    def read_path_counts(self, symbols : Optional[SymbolTable] = None, node : Optional[Hashable] = None) -> OrderedDict[Hashable, tuple[int, int]]:
+        """
+        Read path counts, or only the path counts of node if node is given
+        """
+        return self.read_counts("path_counts", symbols, node)
+
+    def write_node_classes(self, node_classes : Iterable[tuple[Hashable, str, Iterable[Hashable]]], symbols : Optional[SymbolTable] = None):
+
+        # One row per node class, with its neighbors packed as codes
+        rows = ((self.encode(node, symbols), supercls, array('I', (self.encode(neighbor, symbols) for neighbor in neighbors)).tobytes()) for node, supercls, neighbors in node_classes)
+        self.replace("node_classes", rows, 4)
+
+    def update_node_classes(self, changes : Mapping[Hashable, Optional[tuple[Hashable, str, Iterable[Hashable]]]], symbols : Optional[SymbolTable] = None):
+        """
+        Replace only the rows of the node classes in changes (see update_node_classes) in a single transaction
+        Classes mapped to None are removed, and new classes are placed before every other row, in the order of changes
+        """
+        if self.codes is None: self.load_nodes()
+        n_nodes = len(self.ids)
+        first, = self.connection.execute("SELECT MIN(position) FROM node_classes").fetchone()
+        position = (first or 0) - len(changes)
+        with self.connection:
+            for node, params in changes.items():
+                code = self.encode(node, symbols)
+                if params is None:
+                    self.connection.execute("DELETE FROM node_classes WHERE node = ?", (code,))
+                    continue
+
+                # Insert new row before every other row, or replace superclass and neighbors of existing row
+                _, supercls, neighbors = params
+                neighbors = array('I', (self.encode(neighbor, symbols) for neighbor in neighbors)).tobytes()
+                self.connection.execute("INSERT INTO node_classes VALUES (?, ?, ?, ?) ON CONFLICT (node) DO UPDATE SET supercls = excluded.supercls, neighbors = excluded.neighbors", (position, code, supercls, neighbors))
+                position += 1
+
+            # Add ids assigned a code while encoding rows
+            self.connection.executemany("INSERT INTO nodes VALUES (?, ?)", ((code, self.ids[code]) for code in range(n_nodes, len(self.ids))))
+
+    def read_node_classes(self, symbols : Optional[SymbolTable] = None, node : Optional[Hashable] = None) -> list[tuple[Hashable, str, list[Hashable]]]:
+        """
+        Read node class parameters, or only the parameters of the class of node if node is given
+        """
+        decode = self.decoder(symbols, node)
+        node_classes = list()
+        for code, supercls, blob in self.select("node_classes", "node, supercls, neighbors", node, symbols):
+            neighbors = array('I')
+            neighbors.frombytes(blob)
+            node_classes.append((decode(code), supercls, list(map(decode, neighbors))))
+        return node_classes
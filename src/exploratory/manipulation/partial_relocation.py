@@ -1,16 +1,115 @@
-from typing import Iterable
-from collections import deque
-from exploratory.basic.nodes import Node, ValueNode
-from exploratory.basic.trees import Tree
-from exploratory.tools.trees import enumerate_tree_paths
-from exploratory.tools.files import get_files
+from typing import Iterable, Mapping, Optional
+from collections import OrderedDict
+from utilities.types.tree_node import TreeNode
+from exploratory.basic.recursion import get_recursion, get_nonrecursive_ids
+from exploratory.manipulation.relocation import relocate, get_relocated_graph
+from exploratory.manipulation.consolidation import consolidate
 
 
-def partially_relocate(trees):
+def partially_relocate(trees : Iterable[TreeNode], recursion : Optional[Mapping[str, str]] = None):
     """
     Create a tree that is structurally equivalent to a set of trees
     Assumes that two nodes are equal if and only if:
     1. They have the same identifier
-    2. Identifier is not statically recursive
+    2. Identifier is statically recursive, or their parents are equal
+    Each recursive identifier has a single node, as in relocate, and the nodes below it are consolidated up to the next recursive identifier,
+    so the tree has cycles, but keeps the context of non recursive nodes and does not grow with the depth of recursion
+    (non recursive identifiers never appear twice on a path, so each path between recursive nodes is bounded by the grammar)
+    Identifiers are recursive unless recursion (see get_recursion) classifies them as non recursive,
+    so trees are merged in one pass if recursion is given, and are relocated first to find it otherwise
     """
-    pass
\ No newline at end of file
+
+    # Handle arguments
+    if recursion is None:
+        trees = list(trees)
+        if not trees: return None
+        recursion = get_recursion(get_relocated_graph(relocate(trees)))
+    nonrecursive_ids = get_nonrecursive_ids(recursion)
+
+    # Initialize partially relocated tree on first tree
+    relocated = None
+
+    # Dictionary mapping each recursive identifier to its associated node in partially relocated tree
+    node_map = dict()
+
+    # Dictionary mapping each node in partially relocated tree (by id of node) to its children by identifier
+    adj_map = dict()
+
+    # DFS each tree
+    for tree in trees:
+        if relocated is None:
+            relocated = TreeNode(tree.name)
+            adj_map[id(relocated)] = dict()
+            if tree.name not in nonrecursive_ids: node_map[tree.name] = relocated
+        stack = [(relocated, tree)]
+        while stack:
+
+            # Get current node from stack
+            curr_reloc, curr = stack.pop()
+            children = adj_map[id(curr_reloc)]
+
+            # Add each child of current node to stack
+            for next in curr.children:
+
+                # Get child of node in partially relocated tree with same identifier as child
+                next_reloc = children.get(next.name)
+                if next_reloc is None:
+
+                    # Child is recursive, get node in partially relocated tree associated with its identifier
+                    if next.name not in nonrecursive_ids:
+                        next_reloc = node_map.get(next.name)
+                        if next_reloc is None:
+                            next_reloc = node_map[next.name] = TreeNode(next.name)
+                            adj_map[id(next_reloc)] = dict()
+
+                    # Child is not recursive, create node in the context of its parent
+                    else:
+                        next_reloc = TreeNode(next.name)
+                        adj_map[id(next_reloc)] = dict()
+
+                    # Add node in partially relocated tree as child of node with same identifier as current node
+                    curr_reloc.children.append(next_reloc)
+                    children[next.name] = next_reloc
+
+                # Add (node in partially relocated tree associated with next node, next node) to stack
+                stack.append((next_reloc, next))
+
+    return relocated
+
+
+def get_size(tree : TreeNode):
+    """
+    Get the number of distinct nodes and edges of a tree, which may have cycles (see relocate and partially_relocate)
+    """
+
+    # Initialize set of visited nodes (by id of node) and number of edges
+    visited = set()
+    n_edges = 0
+
+    # DFS tree, visiting each node once
+    stack = [tree]
+    while stack:
+        curr = stack.pop()
+        if id(curr) in visited: continue
+        visited.add(id(curr))
+        n_edges += len(curr.children)
+        stack.extend(curr.children)
+
+    return len(visited), n_edges
+
+
+def get_relocation_sizes(trees : list[TreeNode], recursion : Optional[Mapping[str, str]] = None):
+    """
+    Get the (number of nodes, number of edges) of the consolidated, partially relocated and relocated trees of a set of trees
+    """
+
+    # Handle arguments
+    if recursion is None: recursion = get_recursion(get_relocated_graph(relocate(trees)))
+
+    # Size of each form of trees
+    sizes = OrderedDict()
+    sizes["consolidated"] = get_size(consolidate(trees))
+    sizes["partially relocated"] = get_size(partially_relocate(trees, recursion))
+    sizes["relocated"] = get_size(relocate(trees))
+
+    return sizes
@@ -1,5 +1,5 @@
 from typing import Iterable
-from collections import deque
+from collections import deque, OrderedDict
 from utilities.types.tree_node import TreeNode
 
 
@@ -33,7 +33,7 @@ def relocate(trees : Iterable[TreeNode]):
         curr_reloc, curr = stack.pop()
         
         # Add each child of current node to stack
-        for next in curr.childen:
+        for next in curr.children:
             
             # Get node in relocated associated with same identifier as child
             if next.name not in node_map: 
@@ -51,4 +51,28 @@ def relocate(trees : Iterable[TreeNode]):
             # Add (node in relocated with same identifier as next node, next node) to stack
             stack.append((next_reloc, next))
                 
-    return relocated
\ No newline at end of file
+    return relocated
+
+
+def get_relocated_graph(relocated : TreeNode):
+    """
+    Get the list of identifiers adjacent to each identifier in a relocated tree (see relocate)
+    Each identifier has a single node in relocated tree, so each node is visited once, even though relocated tree may have cycles
+    """
+    
+    # Initialize graph
+    graph = OrderedDict()
+    
+    # DFS relocated tree
+    stack = deque([relocated])
+    while stack:
+        
+        # Get current node from stack, skipping nodes already visited
+        curr = stack.pop()
+        if curr.name in graph: continue
+        
+        # Add identifiers of children of current node to graph, and children to stack
+        graph[curr.name] = [next.name for next in curr.children]
+        stack.extend(reversed(curr.children))
+        
+    return graph
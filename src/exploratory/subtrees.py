@@ -1,9 +1,6 @@
-from collections import deque
-from typing import Union
-from static_analysis.parsing.abstract_syntax_tree import get_abstract_syntax_tree
+from typing import Iterator, Union
 from utilities.types.tree_node import TreeNode
-from exploratory.tools import enumerate_tree_paths, enumerate_path_nodes
-from consolidation import consolidate
+from exploratory.consolidation import consolidate, merge_nodes
 
 
 def find_subtrees(trees : Union[TreeNode, list[TreeNode]]):
@@ -13,167 +10,179 @@ def find_subtrees(trees : Union[TreeNode, list[TreeNode]]):
     2.) A cyclic node is never an internal node, unless it is the root
     3.) Each subtree is consolidated, besides each path being shortened at a cyclic node (see consolidated.py)
     * An 'internal node' is a node that is not exclusively a leaf node
+    The subtree of each node is built incrementally, by merging each distinct subtree rooted at an instance of the node,
+    cut at cyclic nodes, into it (so the subpaths of tree are never materialized)
     """
-    
+
     # Consolidate trees
     # A single tree does not need to be consolidated because duplicate paths will be removed
     tree = consolidate(trees) if type(trees) == list else trees
-    
-    # List of all subpaths in tree
-    subpaths = find_subpaths(tree)
-    
-    # Group subpaths rooted at the same node together
-    node_subpath_map = dict()
-    for subpath in subpaths:
-        if subpath.name not in node_subpath_map: node_subpath_map[subpath.name] = []
-        node_subpath_map[subpath.name].append(subpath)
-    
-    # Consolidate each group of rooted subpaths into a rooted subtree
-    subtrees = []
-    for node_subpaths in node_subpath_map.values():
-        subtree = consolidate(node_subpaths)
-        subtrees.append(subtree)
-            
-    return subtrees
-
-
-def find_subpaths(tree : TreeNode):
+
+    # Find nodes at which paths are shortened
+    cyclic_nodes = find_cyclic_nodes(tree)
+
+    # Merge each distinct subtree into the subtree rooted at the same node, in order of first appearance
+    subtrees = dict()
+    for node in find_distinct_subtrees(tree):
+        subtree = subtrees.get(node.name)
+        if subtree is None:
+            subtree = subtrees[node.name] = TreeNode(node.name)
+        merge_nodes([node], subtree, cyclic_nodes)
+
+    return list(subtrees.values())
+
+
+def find_subpaths(tree : TreeNode) -> Iterator[TreeNode]:
     """
     Find all subpaths of a tree
     1.) All paths are linear (each node has 0 .. 1 children)
     2.) Some paths will be cyclic (A -> B -> C -> ... -> A)
-    3.) May return duplicate paths
+    3.) Each distinct path is found exactly once
+    The subpaths of a node are the paths from it to each leaf of its subtree, shortened at the first cyclic node below it
+    Subpaths are hashed as they are found, and only distinct ones are generated
     """
-    
-    # List of subpaths of tree
-    subpaths = list()
-    
+
+    # Find nodes at which paths are shortened
+    cyclic_nodes = find_cyclic_nodes(tree)
+
+    # Set of subpaths found
+    found = set()
+
+    # Iterate over each distinct subtree rooted at an internal node
+    for root in find_distinct_subtrees(tree):
+
+        # Initialize path and stack
+        path = [root.name]
+        stack = [(child, False) for child in reversed(root.children)]
+
+        # DFS
+        while stack:
+            curr, visited = stack.pop()
+
+            # Remove node from path after its children are visited
+            if visited:
+                path.pop()
+                continue
+
+            # Node is a leaf or a cyclic node, the path to it is a subpath
+            if not curr.children or curr.name in cyclic_nodes:
+                subpath = (*path, curr.name)
+                if subpath not in found:
+                    found.add(subpath)
+                    yield get_path(subpath)
+                continue
+
+            # Add node to path and children to stack
+            path.append(curr.name)
+            stack.append((curr, True))
+            stack.extend((child, False) for child in reversed(curr.children))
+
+
+def find_cyclic_nodes(tree : TreeNode) -> set[str]:
+    """
+    Find all cyclic nodes of a tree
+    Each path from root to leaf is scanned from root to leaf with its cycles erased:
+    when a node already on the path is reached, the cycle from its previous instance is erased and the node is cyclic
+    (A -> B -> A -> B has a cycle on A but not on B, as the cycle A -> B -> A is erased before B is reached again)
+    """
+
     # Set of nodes that have been found to be cyclic
     cyclic_nodes = set()
 
-    # Iterate over each path from root to leaf in tree
-    for path in iter(enumerate_tree_paths(tree)):
-        
-        # Get all subpaths of path
-        subpaths.extend(__find_subpaths_helper(path, cyclic_nodes))
-                
-    # Shorten subpaths that contain a cyclic node (not including the root)
-    for subpath in subpaths:
-        prev = None
-        for curr in iter(enumerate_path_nodes(subpath)):
-            if curr != subpath and curr.name in cyclic_nodes and curr.children:
-                new = TreeNode(curr.name)
-                prev.children = [new]
-                break
-            prev = curr
-
-    return subpaths
-
-
-def __find_subpaths_helper(path : TreeNode, cyclic_nodes : set[str]):
+    # Path from root with its cycles erased, and index of each node on it
+    path = list()
+    index = dict()
+
+    # Initialize stack with (node, erased cycle) pairs, where the erased cycle of a visited node is the part of path it erased
+    stack = [(tree, None)]
+
+    # DFS
+    while stack:
+        curr, cycle = stack.pop()
+
+        # Node was visited, remove it from path and restore the cycle it erased
+        if cycle is not None:
+            del index[path.pop()]
+            for node in cycle:
+                index[node] = len(path)
+                path.append(node)
+            continue
+
+        # Node is already on path, erase the cycle from its previous instance
+        i = index.get(curr.name)
+        cycle = path[i:] if i is not None else []
+        if i is not None:
+            cyclic_nodes.add(curr.name)
+            del path[i:]
+            for node in cycle: del index[node]
+
+        # Add node to path and children to stack
+        index[curr.name] = len(path)
+        path.append(curr.name)
+        stack.append((curr, cycle))
+        stack.extend((child, None) for child in reversed(curr.children))
+
+    return cyclic_nodes
+
+
+def find_distinct_subtrees(tree : TreeNode) -> list[TreeNode]:
     """
-    Find all subpaths of a path (used as a subroutine of find_subpaths)
-    1.) All paths are linear (each node has 0 .. 1 children)
-    2.) Some paths will be cyclic (A -> B -> C -> ... -> A)
-    3.) May return duplicate paths
+    Find the root of each distinct subtree of a tree rooted at an internal node, in preorder
+    Subtrees are distinct if they differ in the name of any node or in the number or order of children of any node
+    Each subtree is hashed by the names of its root and the hashes of its children, computed in postorder
     """
-    
-    # List of acyclic subpaths of path
-    subpaths = list()
-    
-    # Stack containing subpaths to check
-    stack = deque()
-    stack.append(path)
-
-    # Iterate over each subpath
+
+    # Identifier of each distinct subtree, and identifier of the subtree of each node (by id of node)
+    subtree_ids = dict()
+    node_ids = dict()
+
+    # Roots of subtrees in preorder
+    roots = list()
+
+    # Initialize stack with (node, visited) pairs
+    stack = [(tree, False)]
+
+    # DFS
     while stack:
-        subpath = stack.pop()
-        
-        # Keep track of nodes seen along subpath
-        visited = set()
-        
-        # Traverse path searching for cycles
-        is_acyclic = True
-        prev_node = None
-        for node in iter(enumerate_path_nodes(subpath)):
-            
-            # Path contains a cycle on node
-            if node.name in visited:
-                
-                # Recreate of the cycle path, inner path, and external path
-                #   Let (A -> ... -> B -> C -> ... -> B -> ... -> D) is the full subpath
-                #   Let (B -> ... -> B) be the cycle path
-                #   Let (A -> ... -> B -> ... -> C) be external path
-                #   Let (C -> ... -> B) be the internal path
-                # Cycle will be added to subpaths, all others will be added to stack
-
-                # Get leaf and root nodes of the cycle path
-                cycle_start_parent = None
-                cycle_start = None
-                cycle_end_parent = prev_node
-                cycle_end = node
-                for cycle_start in iter(enumerate_path_nodes(subpath)):
-                    if cycle_start.name == cycle_end.name: break
-                    cycle_start_parent = cycle_start
-                
-                # Inner path exists if the cycle path is not unary
-                # Root of inner path is the child of the root of the cycle path
-                # Leaf of inner path is the leaf of the cycle path
-                if cycle_end_parent != cycle_start:
-                
-                    # Get the inner path
-                    inner_path = cycle_start.children[0]
-                    stack.append(inner_path)
-
-                # Root of the cycle path is the root of the full subpath
-                # Root of the excluded path is the leaf of the cycle path
-                if cycle_start_parent is None:
-                    
-                    # Get the cycle path
-                    cycle_path = subpath
-                    new = TreeNode(cycle_end.name)
-                    cycle_end_parent.children = [new]
-                    subpaths.append(cycle_path)
-                                        
-                    # Get the excluded path
-                    excluded_path = cycle_end
-                    stack.append(excluded_path)
-                
-                # Root of the excluded path is the root of the full subpath
-                # Child of the parent of root of the cycle path becomes leaf of cycle path
-                else:
-                    
-                    # Get the cycle path
-                    cycle_path = cycle_start
-                    new = TreeNode(cycle_end.name)
-                    cycle_end_parent.children = [new]
-                    subpaths.append(cycle_path)
-                    
-                    # Get the excluded path
-                    excluded_path = subpath
-                    cycle_start_parent.children = [cycle_end]
-                    stack.append(excluded_path)
-                        
-                # Discontinue search of current path to prevent detecting cycles caused by a cycle on a different node
-                # Example:
-                #   Path P : A -> B -> C -> A -> B
-                #   Cycle S: A -> B -> C -> A
-                #   Cycle R: B -> C -> A -> B
-                #   S causes R
-                is_acyclic = False
-                cyclic_nodes.add(node.name)
-                break
-                
-            # Continue along path
-            prev_node = node
-            visited.add(node.name)
-            
-        # Path does not contain a cycle
-        if is_acyclic:
-            
-            # Add each subpath of path to list (excluding the final node, which would be a path of length 1)
-            for node in iter(enumerate_path_nodes(subpath)):
-                if node != prev_node:
-                    subpaths.append(node)
-    
-    return subpaths
\ No newline at end of file
+        curr, visited = stack.pop()
+
+        # Node was visited, get identifier of its subtree from the identifiers of its children
+        if visited:
+            key = (curr.name, tuple(node_ids[id(child)] for child in curr.children))
+            node_ids[id(curr)] = subtree_ids.setdefault(key, len(subtree_ids))
+            continue
+
+        # Leaves are not the root of any subpath
+        if not curr.children:
+            node_ids[id(curr)] = subtree_ids.setdefault((curr.name, ()), len(subtree_ids))
+            continue
+
+        # Add node and children to stack
+        roots.append(curr)
+        stack.append((curr, True))
+        stack.extend((child, False) for child in reversed(curr.children))
+
+    # Keep the first root of each distinct subtree
+    found = set()
+    distinct = list()
+    for root in roots:
+        if node_ids[id(root)] not in found:
+            found.add(node_ids[id(root)])
+            distinct.append(root)
+
+    return distinct
+
+
+def get_path(names : tuple[str, ...]) -> TreeNode:
+    """
+    Create a linear path of nodes from a sequence of names
+    """
+
+    # Create each node as the child of the previous node
+    root = prev = TreeNode(names[0])
+    for name in names[1:]:
+        curr = TreeNode(name)
+        prev.children = [curr]
+        prev = curr
+
+    return root
@@ -1,5 +1,6 @@
 import os
 import re
+from hashlib import sha256
 
 
 def get_files(rootdir : str, extension : str):
@@ -44,4 +45,27 @@ def get_sources(src_rootdir : str):
             filepath = os.path.join(dirpath, fpath)
             filepaths.append(str(filepath))
 
-    return filepaths
\ No newline at end of file
+    return filepaths
+
+
+def get_file_hash(filepath : str):
+
+    # Hash file content in chunks
+    h = sha256()
+    f = open(filepath, 'rb')
+    for chunk in iter(lambda : f.read(1 << 20), b""): 
+        h.update(chunk)
+    f.close()
+    
+    return h.hexdigest()
+
+
+def get_files_hash(filepaths : list[str], rootdir : str):
+
+    # Hash the path relative to rootdir and the content hash of each file, in sorted order
+    h = sha256()
+    for filepath in sorted(filepaths):
+        h.update(os.path.relpath(filepath, rootdir).encode())
+        h.update(get_file_hash(filepath).encode())
+        
+    return h.hexdigest()
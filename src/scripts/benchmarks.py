@@ -0,0 +1,660 @@
+from exploratory.basic.trees import Tree
+from exploratory.basic.nodes import Node, SlotNode
+from exploratory.basic.parsers import StandardParser, BulkParser, FlangParser, StreamingFlangParser
+from exploratory.basic.array_trees import ArrayTree
+from exploratory.basic.symbols import SymbolTable
+from exploratory.basic.structures import TreeStructure, StructureQueryTool
+from exploratory.basic.predicates import Count, Min
+from exploratory.basic.ingestion import ingest
+from exploratory.basic.cache import TreeCache
+from exploratory.basic.counts import SparseCounts
+from exploratory.basic.recursion import get_id_graph, get_recursion, NON_RECURSIVE, DIRECTLY_RECURSIVE, VARIABLY_RECURSIVE
+from exploratory.tools.files import get_files
+from collections import Counter, deque
+from tempfile import mkdtemp
+from time import perf_counter
+import tracemalloc
+import random
+import re
+import sys
+import os
+
+
+def random_tree(n_nodes : int, ids : list[str], seed : int = 0, max_depth : int = 48) -> Tree:
+    """
+    Create a random tree with n_nodes nodes whose ids are drawn from ids
+    """
+
+    # Initialize tree, random number generator and path from root to most recent node
+    rng = random.Random(seed)
+    tree = Tree()
+    path = [tree]
+
+    # Attach each new node to a node on the path to the most recent node
+    # Backtracking a few nodes at a time produces deep, recursive chains similar to Flang expression trees
+    for i in range(n_nodes):
+        backtrack = min(len(path) - 1, int(rng.expovariate(0.7)))
+        if len(path) > max_depth: backtrack = max(backtrack, len(path) - max_depth)
+        del path[len(path) - backtrack:]
+        node = Node(rng.choice(ids), str(i) if rng.random() < 0.2 else None)
+        path[-1].add_adj(node)
+        path.append(node)
+
+    return tree
+
+
+def random_corpus(n_trees : int, n_nodes : int) -> str:
+    """
+    Write a corpus of random trees to a temporary directory and return the directory
+    """
+
+    # Grammar ids resembling Flang parse tree ids
+    ids = ["Expr", "Subtract", "Add", "Designator", "DataRef", "Name", "ValueStr",
+           "ExecutionPart", "Block", "AssignmentStmt", "Variable", "LiteralConstant"]
+
+    # Write each tree
+    rootdir = mkdtemp()
+    for i in range(n_trees):
+        random_tree(n_nodes, ids, seed=i).to_file(os.path.join(rootdir, "{}.txt".format(i)))
+
+    return rootdir
+
+
+def timed(f, *args):
+    """
+    Call f with args and return its result and the elapsed time in seconds
+    """
+    start = perf_counter()
+    result = f(*args)
+    return result, perf_counter() - start
+
+
+def benchmark_parsers(n_trees : int = 20, n_nodes : int = 50000):
+    """
+    Compare the throughput of StandardParser and BulkParser
+    """
+
+    # Generate corpus
+    filepaths = get_files(random_corpus(n_trees, n_nodes), "txt")
+    n_bytes = sum(os.path.getsize(filepath) for filepath in filepaths)
+
+    # Parse corpus with each parser
+    results = dict()
+    for name, parser_cls in (("StandardParser", StandardParser(Node, str)), ("BulkParser", BulkParser(Node, str))):
+        events, elapsed = timed(lambda : [[(d, n.id, n.value) for d, n in parser_cls(f)] for f in filepaths])
+        results[name] = events
+        print("{:<16} {:8.3f} s {:8.1f} MB/s".format(name, elapsed, n_bytes / elapsed / 1e6))
+
+    # Both parsers must yield the same events
+    assert results["StandardParser"] == results["BulkParser"]
+
+
+def benchmark_binary(n_trees : int = 20, n_nodes : int = 50000):
+    """
+    Compare loading a corpus from the text format and from the binary format
+    """
+
+    # Generate corpus and write each tree in the binary format
+    filepaths = get_files(random_corpus(n_trees, n_nodes), "txt")
+    for filepath in filepaths:
+        Tree.from_file(filepath).to_binary(filepath[:-len("txt")] + "bin")
+
+    # Load corpus from each format
+    text_trees, text_elapsed = timed(lambda : [Tree.from_file(f) for f in filepaths])
+    binary_trees, binary_elapsed = timed(lambda : [Tree.from_binary(f[:-len("txt")] + "bin") for f in filepaths])
+    print("{:<8} {:8.3f} s {:8.1f} MB".format("text", text_elapsed, sum(os.path.getsize(f) for f in filepaths) / 1e6))
+    print("{:<8} {:8.3f} s {:8.1f} MB".format("binary", binary_elapsed, sum(os.path.getsize(f[:-len("txt")] + "bin") for f in filepaths) / 1e6))
+
+    # Both formats must load the same trees
+    for text_tree, binary_tree in zip(text_trees, binary_trees):
+        assert [(d, n.id, n.value) for d, n in text_tree.dfs()] == [(d, n.id, n.value) for d, n in binary_tree.dfs()]
+
+
+def traced(f, *args):
+    """
+    Call f with args and return its result and the memory it allocated in bytes
+    """
+    tracemalloc.start()
+    result = f(*args)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def benchmark_array_tree(n_nodes : int = 200000):
+    """
+    Compare the memory and path enumeration time of Tree and ArrayTree
+    """
+
+    # Build the same tree in each representation
+    ids = ["Expr", "Subtract", "Add", "Designator", "DataRef", "Name", "ValueStr"]
+    tree, tree_size = traced(random_tree, n_nodes, ids)
+    array_tree, array_tree_size = traced(ArrayTree.from_tree, tree)
+
+    # Enumerate the split paths of each representation
+    tree_paths, tree_elapsed = timed(lambda : [[node.id for node in path] for path in tree.paths])
+    array_paths, array_elapsed = timed(lambda : [array_tree.path_ids(path) for path in array_tree.paths])
+    print("{:<10} {:8.3f} s {:8.1f} MB".format("Tree", tree_elapsed, tree_size / 1e6))
+    print("{:<10} {:8.3f} s {:8.1f} MB".format("ArrayTree", array_elapsed, array_tree_size / 1e6))
+
+    # Both representations must yield the same paths
+    assert tree_paths == array_paths
+
+
+def benchmark_symbols(n_trees : int = 10, n_nodes : int = 20000):
+    """
+    Compare the memory and path enumeration time of trees with string ids and interned ids
+    """
+
+    # Generate corpus
+    filepaths = get_files(random_corpus(n_trees, n_nodes), "txt")
+    symbols = SymbolTable()
+
+    # Load corpus with and without interning ids
+    for name, table in (("str", None), ("interned", symbols)):
+        trees, size = traced(lambda : [Tree.from_file(filepath, table) for filepath in filepaths])
+        n_paths, elapsed = timed(lambda : sum(1 for tree in trees for path in tree.paths))
+        print("{:<10} {:8.3f} s {:8.1f} MB {} paths".format(name, elapsed, size / 1e6, n_paths))
+
+
+def benchmark_slot_nodes(n_trees : int = 10, n_nodes : int = 20000, width : int = 5000):
+    """
+    Compare the memory per node of Node and SlotNode, and the time to look up children of a wide node
+    """
+
+    # Generate corpus
+    filepaths = get_files(random_corpus(n_trees, n_nodes), "txt")
+
+    # Load corpus with each node class
+    for node_cls in (Node, SlotNode):
+        trees, size = traced(lambda : [Tree.from_file(filepath, node_cls=node_cls) for filepath in filepaths])
+        print("{:<10} {:8.1f} bytes per node".format(node_cls.__name__, size / (n_trees * n_nodes)))
+
+    # Look up each child of a wide node, similar to an ExecutionPart with thousands of statements
+    for node_cls in (Node, SlotNode):
+        wide = node_cls("ExecutionPart")
+        for i in range(width): wide.add_adj(node_cls("Stmt{}".format(i)))
+        _, elapsed = timed(lambda : [wide.get_adj("Stmt{}".format(i)) for i in range(width)])
+        print("{:<10} {:8.3f} s to look up {} children".format(node_cls.__name__, elapsed, width))
+
+
+def flang_dump(tree : Tree, filepath : str) -> list[tuple[int, str, str]]:
+    """
+    Write a tree to file in the format of a flang-new parse tree dump, and return the (depth, id, value) events it encodes
+    Chains of nodes with a single child are joined by '->' and values are written as quoted strings,
+    except that every other leaf without a value ending a chain is written as an unquoted value ('Intent = In')
+    """
+
+    # Initialize lines, events and stack of (node, depth, whether node starts a new line)
+    lines : list[str] = list()
+    events : list[tuple[int, str, str]] = list()
+    stack = [(node, 0, True) for node in tree.adj_gen]
+
+    # DFS
+    while stack:
+        node, depth, new_line = stack.pop()
+
+        # Add node to a new line, or to the chain on the previous line
+        children = list(node.adj_gen)
+        if new_line: lines.append("{}{}".format("| " * depth, node.id))
+        elif node.value is None and not children and len(events) % 2: lines[-1] += " = {}".format(node.id)
+        else: lines[-1] += " -> {}".format(node.id)
+        events.append((depth, node.id, None))
+
+        # Add value to line
+        if node.value is not None:
+            lines[-1] += " = '{}'".format(node.value)
+            events.append((depth + 1, "StrVal", node.value))
+
+        # Continue chain if node has a single child and no value
+        chain = node.value is None and len(children) == 1
+        stack.extend((child, depth + 1, not chain) for child in children)
+
+    # Write to file
+    f = open(filepath, 'w')
+    f.write("\n".join(lines) + "\n")
+    f.close()
+
+    return events
+
+
+def benchmark_flang_parsers(n_trees : int = 10, n_nodes : int = 50000):
+    """
+    Compare the time and peak memory of FlangParser and StreamingFlangParser on recorded parse tree dumps,
+    replayed by a stand-in for flang-new
+    """
+
+    # Record a parse tree dump of each random tree
+    ids = ["Expr", "Subtract", "Add", "Designator", "DataRef", "Name", "ExecutionPart", "Block", "AssignmentStmt"]
+    rootdir = mkdtemp()
+    dumps = list()
+    for i in range(n_trees):
+        filepath = os.path.join(rootdir, "{}.dump".format(i))
+        dumps.append((filepath, flang_dump(random_tree(n_nodes, ids, seed=i), filepath)))
+
+    # Replace flang-new with the stand-in
+    command = '"{}" "{}" -fc1 -fdebug-dump-parse-tree-no-sema {{}}'.format(sys.executable, os.path.join(os.path.dirname(__file__), "flang_replay.py"))
+
+    # Parse dumps with each parser, consuming events as they are yielded
+    for parser_cls in (FlangParser(Node, command=command), StreamingFlangParser(Node, command=command)):
+        tracemalloc.start()
+        n_events, elapsed = timed(lambda : sum(1 for filepath, _ in dumps for _ in parser_cls(filepath)))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print("{:<24} {:8.3f} s {:8.1f} MB peak {} nodes".format(parser_cls.__name__.strip("_"), elapsed, peak / 1e6, n_events))
+
+    # Streaming parser must yield the events encoded in each dump
+    for filepath, events in dumps:
+        assert events == [(d, n.id, n.value) for d, n in parser_cls(filepath)]
+
+
+def benchmark_ingestion(n_trees : int = 64, n_nodes : int = 10000, max_workers : int = os.cpu_count()):
+    """
+    Compare the throughput of ingesting a corpus into a structure with 1 ... max_workers worker processes
+    """
+
+    # Generate corpus
+    filepaths = get_files(random_corpus(n_trees, n_nodes), "txt")
+
+    # Ingest corpus serially with add_tree
+    serial = TreeStructure()
+    _, elapsed = timed(lambda : [serial.add_tree(Tree.from_file(filepath)) for filepath in filepaths])
+    print("{:<10} {:8.3f} s {:8.1f} files/s".format("add_tree", elapsed, n_trees / elapsed))
+    expected = [(d, n.id, dict(n.value)) for d, n in serial.dfs()]
+
+    # Ingest corpus with an increasing number of workers
+    n_workers = 1
+    while n_workers <= max_workers:
+        structure, elapsed = timed(ingest, filepaths, None, n_workers)
+        print("{:<10} {:8.3f} s {:8.1f} files/s".format("{} workers".format(n_workers), elapsed, n_trees / elapsed))
+
+        # Structure must be identical to the serially ingested structure
+        assert [(d, n.id, dict(n.value)) for d, n in structure.dfs()] == expected
+        n_workers *= 2
+
+
+def benchmark_cache(n_trees : int = 20, n_nodes : int = 50000):
+    """
+    Compare loading a corpus without a cache, into an empty cache and from a warm cache
+    """
+
+    # Generate corpus and cache
+    filepaths = get_files(random_corpus(n_trees, n_nodes), "txt")
+    cache = TreeCache(mkdtemp())
+
+    # Load corpus with each cache state
+    for name, c in (("uncached", None), ("cold", cache), ("warm", cache)):
+        _, elapsed = timed(lambda : [Tree.from_file(filepath, cache=c) for filepath in filepaths])
+        print("{:<10} {:8.3f} s".format(name, elapsed))
+    print(cache.stats)
+
+
+def benchmark_sparse_counts(n_trees : int = 100, n_nodes : int = 2000):
+    """
+    Compare the memory, ingestion time and count lookup time of structures with Counter and SparseCounts node values
+    """
+
+    # Generate and load corpus
+    filepaths = get_files(random_corpus(n_trees, n_nodes), "txt")
+    trees = [Tree.from_file(filepath) for filepath in filepaths]
+
+    # Build a structure with each count class
+    results = list()
+    for counts_cls in (Counter, SparseCounts):
+        structure = TreeStructure(counts_cls=counts_cls)
+        _, elapsed = timed(lambda : [structure.add_tree(tree) for tree in trees])
+        nodes = [node for _, node in structure.dfs()]
+
+        # Measure the memory of the counts in each node (including the array of SparseCounts)
+        size = sum(sys.getsizeof(node.value) + sys.getsizeof(getattr(node.value, "entries", b"")) - sys.getsizeof(b"") for node in nodes)
+
+        # Look up the count of every tree at every node, as StructureQueryTool.query does
+        _, query_elapsed = timed(lambda : [node.value[t] if t in node.value else 0 for node in nodes for t in range(n_trees)])
+        print("{:<12} {:8.3f} s to add {:8.3f} s to look up {:8.1f} MB of counts in {} nodes".format(counts_cls.__name__, elapsed, query_elapsed, size / 1e6, len(nodes)))
+        results.append([(d, n.id, dict(n.value)) for d, n in structure.dfs()])
+
+    # Both structures must hold the same counts
+    assert results[0] == results[1]
+
+
+def benchmark_insert_tree(n_trees : int = 4, n_nodes : int = 50000, max_depth : int = 200):
+    """
+    Compare adding deep trees to a structure path by path and in a single traversal
+    """
+
+    # Generate deep trees with ids of Flang expressions
+    ids = ["Expr", "Subtract", "Add", "Multiply", "Parentheses", "Designator", "DataRef", "Name", "ValueStr"]
+    trees = [random_tree(n_nodes, ids, seed=i, max_depth=max_depth) for i in range(n_trees)]
+
+    # Build a structure with each insertion mode
+    results = list()
+    for name, single_pass in (("add_path", False), ("single", True)):
+        structure = TreeStructure()
+        _, elapsed = timed(lambda : [structure.add_tree(tree, single_pass=single_pass) for tree in trees])
+        print("{:<10} {:8.3f} s {:8.1f} nodes/s".format(name, elapsed, n_trees * n_nodes / elapsed))
+        results.append(structure.to_json())
+
+    # Both modes must build the same structure
+    assert results[0] == results[1]
+
+
+def copied_paths(tree : Tree):
+    """
+    Reference enumeration of Tree.paths that rescans and copies each split path
+    """
+
+    # Iterate over each path in tree
+    for full_path in tree.complete_paths:
+
+        # Possibly recursive paths
+        paths = deque()
+        paths.append(full_path)
+
+        # Repeat until all paths are yielded (reduced to a non-recursive representation)
+        while paths:
+
+            # Get next path and initialize set of node ids visited along it
+            path = paths.pop()
+            visited = set()
+
+            # Iterate over each node in path
+            for curr in path:
+
+                # First instance of node
+                if curr.id not in visited:
+                    visited.add(curr.id)
+
+                # Second instance of node, node is not leaf
+                elif curr != path[-1]:
+
+                    # Split path into path up to second instance, and path from first instance skipping to after second instance
+                    first = next(k for k, node in enumerate(path) if node.id == curr.id)
+                    second = next(k for k, node in enumerate(path) if k > first and node.id == curr.id)
+                    yield deque(list(path)[:second + 1])
+                    paths.append(deque(list(path)[:first + 1] + list(path)[second + 1:]))
+                    break
+
+                # Node is leaf
+                if curr == path[-1]:
+                    yield path
+
+
+def benchmark_paths(n_seeds : int = 200, n_nodes : int = 20000, max_depth : int = 200):
+    """
+    Check that Tree.paths yields the same paths as the reference enumeration on random trees,
+    then compare their time on a deep tree
+    """
+
+    # Compare paths of small random trees with few distinct ids, so most paths are split several times
+    id_sets = [["A", "B"], ["A", "B", "C"], ["Expr", "Add", "Designator", "DataRef", "Name"]]
+    for seed in range(n_seeds):
+        tree = random_tree(200, id_sets[seed % len(id_sets)], seed=seed, max_depth=8 + seed % 24)
+        expected = [[node.id for node in path] for path in copied_paths(tree)]
+        assert [[node.id for node in path] for path in tree.paths] == expected, seed
+
+        # Same tree with interned ids
+        symbols = SymbolTable()
+        tree = random_tree(200, [symbols.intern(id) for id in id_sets[seed % len(id_sets)]], seed=seed, max_depth=8 + seed % 24)
+        assert [[symbols.lookup(node.id) for node in path] for path in tree.paths] == expected, seed
+    print("{} random trees checked, with str and interned ids".format(n_seeds))
+
+    # Enumerate the paths of a deep tree with each implementation
+    ids = ["Expr", "Subtract", "Add", "Multiply", "Parentheses", "Designator", "DataRef", "Name", "ValueStr"]
+    tree = random_tree(n_nodes, ids, max_depth=max_depth)
+    for name, paths in (("copied", lambda : copied_paths(tree)), ("views", lambda : tree.paths)):
+        n_paths, elapsed = timed(lambda : sum(1 for path in paths()))
+        print("{:<10} {:8.3f} s {} paths".format(name, elapsed, n_paths))
+
+
+def grammar_tree(n_stmts : int, seed : int = 0, max_depth : int = 8) -> Tree:
+    """
+    Create a tree of assignment statements resembling a Flang parse tree,
+    where expressions are recursive chains of Expr nodes wrapped in non-recursive statement and designator nodes
+    """
+
+    # Initialize tree and random number generator
+    rng = random.Random(seed)
+    tree = Tree()
+    block = Node("Block")
+    tree.add_adj(Node("ExecutionPart"))
+    next(tree.adj_gen).add_adj(block)
+
+    # Create designator
+    def designator() -> Node:
+        node = Node("Designator")
+        node.add_adj(Node("DataRef"))
+        next(node.adj_gen).add_adj(Node("Name", "x"))
+        return node
+
+    # Create each statement, with its expression built from an explicit stack of (Expr node, depth) pairs
+    for i in range(n_stmts):
+        stmt = Node("AssignmentStmt")
+        variable = Node("Variable")
+        variable.add_adj(designator())
+        expr = Node("Expr")
+        stmt.add_adj(variable)
+        stmt.add_adj(expr)
+        block.add_adj(stmt)
+        stack = [(expr, 0)]
+        while stack:
+            expr, depth = stack.pop()
+            r = rng.random() if depth < max_depth else 1.0
+            if r < 0.5:
+                op = Node(rng.choice(["Add", "Subtract"]))
+                expr.add_adj(op)
+                for _ in range(2):
+                    operand = Node("Expr")
+                    op.add_adj(operand)
+                    stack.append((operand, depth + 1))
+            elif r < 0.6:
+                operand = Node("Expr")
+                expr.add_adj(operand)
+                stack.append((operand, depth + 1))
+            elif r < 0.8:
+                expr.add_adj(designator())
+            else:
+                expr.add_adj(Node("LiteralConstant", str(i)))
+
+    return tree
+
+
+def reachable_ids(graph : dict[str, list[str]], id : str) -> set[str]:
+    """
+    Reference set of ids reachable from id in one or more steps
+    """
+    reached = set()
+    stack = list(graph.get(id, ()))
+    while stack:
+        next = stack.pop()
+        if next in reached: continue
+        reached.add(next)
+        stack.extend(graph.get(next, ()))
+    return reached
+
+
+def benchmark_recursion(n_seeds : int = 100, n_stmts : int = 5000):
+    """
+    Time building the id graph of grammar trees and classifying its ids by recursion,
+    then check the classification of random graphs against reachability
+    """
+
+    # Classify ids of grammar trees
+    graph, elapsed = timed(get_id_graph, [grammar_tree(n_stmts, seed) for seed in range(4)])
+    recursion, scc_elapsed = timed(get_recursion, graph)
+    print("{:<10} {:8.3f} s {} ids".format("graph", elapsed, len(graph)))
+    print("{:<10} {:8.3f} s {}".format("recursion", scc_elapsed, sorted(recursion.items())))
+    assert recursion["Expr"] == recursion["Add"] == VARIABLY_RECURSIVE and recursion["Name"] == recursion["Block"] == NON_RECURSIVE
+    assert get_recursion({"A" : ["A", "B"], "B" : []}) == {"A" : DIRECTLY_RECURSIVE, "B" : NON_RECURSIVE}
+
+    # An id is recursive if it reaches itself, and variably recursive if it reaches another id that reaches it
+    for seed in range(n_seeds):
+        rng = random.Random(seed)
+        ids = [str(i) for i in range(20)]
+        graph = {id : rng.sample(ids, rng.randint(0, 2)) for id in ids}
+        reached = {id : reachable_ids(graph, id) for id in ids}
+        for id, kind in get_recursion(graph).items():
+            if any(id in reached[other] for other in reached[id] if other != id): assert kind == VARIABLY_RECURSIVE, seed
+            elif id in reached[id]: assert kind == DIRECTLY_RECURSIVE, seed
+            else: assert kind == NON_RECURSIVE, seed
+    print("{} random graphs checked".format(n_seeds))
+
+    # Classify a chain of ids longer than the recursion limit, closed into a single cycle
+    ids = [str(i) for i in range(20000)]
+    graph = {id : [next] for id, next in zip(ids, ids[1:] + ids[:1])}
+    recursion, elapsed = timed(get_recursion, graph)
+    assert set(recursion.values()) == {VARIABLY_RECURSIVE}
+    print("{:<10} {:8.3f} s {} ids in one cycle".format("cycle", elapsed, len(ids)))
+
+
+def benchmark_restructure(n_trees : int = 20, n_nodes : int = 20000):
+    """
+    Compare restructuring on several ids one at a time, all at once, and again once memoized
+    """
+
+    # Build structure
+    ids = ["Expr", "Subtract", "Add", "Designator", "DataRef", "Name", "ValueStr"]
+    structure = TreeStructure()
+    for i in range(n_trees): structure.add_tree(random_tree(n_nodes, ids, seed=i))
+    targets = ["Expr", "Add", "Designator"]
+
+    # Restructure on each id in turn, forgetting memoized structures
+    def separately():
+        results = dict()
+        for id in targets:
+            structure.restructured.clear()
+            results[id] = structure.restructure(id)
+        return results
+    separate, elapsed = timed(separately)
+    print("{:<10} {:8.3f} s".format("separate", elapsed))
+
+    # Restructure on all ids in one traversal, then again
+    structure.restructured.clear()
+    for name in ("many", "memoized"):
+        combined, elapsed = timed(structure.restructure_many, targets)
+        print("{:<10} {:8.3f} s".format(name, elapsed))
+
+    # Both must build the same structures (up to the order of children)
+    canonical = lambda structure : sorted((depth, node.id, sorted(node.value.items())) for depth, node in structure.dfs())
+    assert all(canonical(separate[id]) == canonical(combined[id]) for id in targets)
+
+
+def benchmark_query(n_trees : int = 100000, n_paths : int = 4):
+    """
+    Compare a query with a callable activation function and with a vectorized predicate
+    """
+
+    # Build structure where each path appears a random number of times in a random half of the trees
+    rng = random.Random(0)
+    structure = TreeStructure(n_trees)
+    paths = [["Expr", "Add"] + ["Expr"] * i for i in range(n_paths)]
+    for path in paths:
+        for tree_id in sorted(rng.sample(range(n_trees), n_trees // 2)):
+            structure.add_ids(path, tree_id, rng.randint(1, 4))
+    tool = StructureQueryTool(structure)
+    _, elapsed = timed(tool.count_matrix, paths)
+    print("{:<10} {:8.3f} s".format("gather", elapsed))
+
+    # Query trees containing the first path, and every path at least twice or the last path more than 3 times
+    activation = lambda X : X[0] > 0 and (min(X) >= 2 or X[-1] > 3)
+    predicate = (Count(0) > 0) & ((Min() >= 2) | (Count(n_paths - 1) > 3))
+    results = list()
+    for name, a in (("callable", activation), ("vectorized", predicate)):
+        n_activations, elapsed = timed(tool.query, paths, a)
+        print("{:<10} {:8.3f} s {} trees".format(name, elapsed, n_activations))
+        results.append(n_activations)
+
+    # Both activations must select the same trees
+    assert results[0] == results[1]
+
+
+def benchmark_match(n_trees : int = 20, n_nodes : int = 20000):
+    """
+    Compare looking up paths and matching patterns with the path index against walking and scanning the structure
+    """
+
+    # Build structure, indexing paths as they are inserted
+    ids = ["Expr", "Subtract", "Add", "Designator", "DataRef", "Name", "ValueStr"]
+    structure = TreeStructure()
+    structure.build_index()
+    for i in range(n_trees): structure.add_tree(random_tree(n_nodes, ids, seed=i))
+    paths = list(structure.path_index)
+
+    # Look up the end of every path
+    _, elapsed = timed(lambda : [structure.get_path(path)[-1] for path in paths])
+    print("{:<10} {:8.3f} s {} paths".format("walk", elapsed, len(paths)))
+    _, elapsed = timed(lambda : [structure.get_node(path) for path in paths])
+    print("{:<10} {:8.3f} s {} paths".format("index", elapsed, len(paths)))
+
+    # Match patterns in the structure, and by scanning every path
+    for pattern in ("Expr/*/Subtract", "Expr/Add/**/Name"):
+        matches, elapsed = timed(structure.match, pattern)
+        regex = re.compile("^" + "".join({"*" : r"[^/]+/", "**" : r"(?:[^/]+/)*"}.get(s, re.escape(s) + "/") for s in pattern.split("/")) + "$")
+        scanned, scan_elapsed = timed(lambda : [path for path in paths if regex.match("".join(id + "/" for id in path))])
+        print("{:<18} {:8.3f} s {:8.3f} s scanning {} matches".format(pattern, elapsed, scan_elapsed, len(matches)))
+        assert sorted(path for path, _ in matches) == sorted(scanned)
+
+
+def benchmark_occurrences(n_trees : int = 20, n_nodes : int = 20000):
+    """
+    Compare finding the occurrences of an id and restructuring with the inverted index against traversing the structure
+    """
+
+    # Build structure
+    ids = ["Expr", "Subtract", "Add", "Designator", "DataRef", "Name", "ValueStr"]
+    structure = TreeStructure()
+    for i in range(n_trees): structure.add_tree(random_tree(n_nodes, ids, seed=i))
+
+    # Find the occurrences of an id
+    occurrences, elapsed = timed(structure.occurrences, "Name")
+    print("{:<10} {:8.3f} s {} occurrences".format("index", elapsed, len(occurrences)))
+    scanned, elapsed = timed(lambda : [node for _, node in structure.dfs() if node.id == "Name"])
+    print("{:<10} {:8.3f} s {} occurrences".format("scan", elapsed, len(scanned)))
+
+    # Restructure on an id with and without the inverted index
+    canonical = lambda structure : sorted((depth, node.id, sorted(node.value.items())) for depth, node in structure.dfs())
+    results = list()
+    for name in ("index", "traversal"):
+        if name == "traversal": structure.id_index = None
+        structure.restructured.clear()
+        restructured, elapsed = timed(structure.restructure, "Name")
+        print("{:<10} {:8.3f} s to restructure".format(name, elapsed))
+        results.append(canonical(restructured))
+
+    # Both must build the same structure (up to the order of children)
+    assert results[0] == results[1]
+
+
+def benchmark_totals(n_trees : int = 20, n_nodes : int = 20000):
+    """
+    Compare total counts of a structure by traversal, computing subtree totals, looking them up, and updating them after an insert
+    """
+
+    # Build structure
+    ids = ["Expr", "Subtract", "Add", "Designator", "DataRef", "Name", "ValueStr"]
+    structure = TreeStructure()
+    for i in range(n_trees): structure.add_tree(random_tree(n_nodes, ids, seed=i))
+    tool = StructureQueryTool(structure)
+
+    # Sum counts of every node
+    def traverse():
+        counter = Counter()
+        for _, node in structure.dfs(): counter.update(node.value)
+        return counter
+    expected, elapsed = timed(traverse)
+    print("{:<10} {:8.3f} s".format("traversal", elapsed))
+
+    # Compute, look up, and update subtree totals
+    for name in ("compute", "lookup", "update"):
+        if name == "update":
+            structure.add_tree(random_tree(n_nodes // 10, ids, seed=n_trees), 0)
+            expected = traverse()
+        totals, elapsed = timed(tool.matrix)
+        print("{:<10} {:8.3f} s".format(name, elapsed))
+        assert totals == expected
+
+
+if __name__ == "__main__":
+
+    # Run each benchmark named on the command line
+    for name in sys.argv[1:]:
+        globals()[name]()
@@ -0,0 +1,441 @@
+from exploratory.data.edge_counts import get_edge_counts
+from exploratory.data.adjacent_counts import get_adjacent_counts
+from exploratory.data.edge_counts import write_edge_counts, read_edge_counts
+from exploratory.data.adjacent_counts import write_adjacent_counts, read_adjacent_counts
+from exploratory.data.corpus_statistics import CorpusStatistics, get_statistics
+from exploratory.data.node_classes import get_node_classes, update_node_classes
+from exploratory.data.store import StatisticsStore
+from exploratory.basic.symbols import SymbolTable
+from exploratory.consolidation import consolidate
+from exploratory.subtrees import find_subtrees, find_subpaths, find_cyclic_nodes
+from exploratory.manipulation.partial_relocation import partially_relocate, get_relocation_sizes
+from exploratory.manipulation.relocation import relocate, get_relocated_graph
+from exploratory.basic.recursion import get_recursion
+from utilities.types.tree_node import TreeNode
+from collections import Counter, OrderedDict
+from functools import reduce
+from tempfile import mkdtemp
+from time import perf_counter
+import random
+import sys
+import os
+
+
+class NamedNode:
+    """
+    Minimal node with the name and children attributes of TreeNode
+    """
+
+    __slots__ = ("name", "children")
+
+    def __init__(self, name : str):
+        self.name : str = name
+        self.children : list[NamedNode] = list()
+
+
+def random_named_tree(n_nodes : int, names : list[str], seed : int = 0, max_depth : int = 48) -> NamedNode:
+    """
+    Create a random tree with n_nodes nodes whose names are drawn from names, with deep recursive chains
+    """
+    rng = random.Random(seed)
+    root = NamedNode("Program")
+    path = [root]
+    for i in range(n_nodes):
+        backtrack = min(len(path) - 1, int(rng.expovariate(0.7)))
+        if len(path) > max_depth: backtrack = max(backtrack, len(path) - max_depth)
+        del path[len(path) - backtrack:]
+        node = NamedNode(rng.choice(names))
+        path[-1].children.append(node)
+        path.append(node)
+    return root
+
+
+def timed(f, *args):
+    """
+    Call f with args and return its result and elapsed time in seconds
+    """
+    start = perf_counter()
+    result = f(*args)
+    return result, perf_counter() - start
+
+
+def path_counts_by_paths(trees : list[NamedNode]):
+    """
+    Path counts computed by materializing every path from root to leaf
+    """
+    path_counts = dict()
+    stack = [(tree, [tree.name]) for tree in trees]
+    while stack:
+        curr, path = stack.pop()
+        if not curr.children:
+            for node, count in Counter(path).items():
+                mn, mx = path_counts.get(node, (count, count))
+                path_counts[node] = (min(count, mn), max(count, mx))
+        stack.extend((child, path + [child.name]) for child in curr.children)
+    return path_counts
+
+
+def benchmark_statistics(n_trees : int = 20, n_nodes : int = 20000):
+    """
+    Compare computing edge, adjacent and path counts in separate passes and in a single pass per tree
+    """
+
+    # Generate trees
+    names = ["Expr", "Subtract", "Add", "Designator", "DataRef", "Name", "ValueStr"]
+    trees = [random_named_tree(n_nodes, names, seed=i) for i in range(n_trees)]
+
+    # Compute each statistic in its own pass
+    (edge_counts, adj_counts, path_counts), elapsed = timed(lambda : (get_edge_counts(trees), get_adjacent_counts(trees), path_counts_by_paths(trees)))
+    print("{:<10} {:8.3f} s".format("separate", elapsed))
+
+    # Compute all statistics in one pass
+    statistics, elapsed = timed(get_statistics, trees)
+    print("{:<10} {:8.3f} s".format("fused", elapsed))
+
+    # Both must compute the same statistics
+    assert {node : dict(counts) for node, counts in statistics.edge_counts.items()} == {node : dict(counts) for node, counts in edge_counts.items()}
+    assert dict(statistics.adj_counts) == dict(adj_counts)
+    assert dict(statistics.path_counts) == path_counts
+
+
+def benchmark_merge(n_trees : int = 40, n_nodes : int = 10000, n_shards : int = 8):
+    """
+    Compare collecting statistics of all trees at once with collecting them per shard, saving, loading and merging the shards
+    """
+
+    # Generate trees
+    names = ["Expr", "Subtract", "Add", "Designator", "DataRef", "Name", "ValueStr"]
+    trees = [random_named_tree(n_nodes, names, seed=i) for i in range(n_trees)]
+    shards = [trees[i::n_shards] for i in range(n_shards)]
+
+    # Collect statistics of all trees at once
+    expected, elapsed = timed(get_statistics, trees)
+    print("{:<10} {:8.3f} s".format("all", elapsed))
+
+    # Collect, save and load statistics of each shard
+    rootdir = mkdtemp()
+    def collect():
+        for i, shard in enumerate(shards): get_statistics(shard).save(os.path.join(rootdir, "{}.json".format(i)))
+        return [CorpusStatistics.load(os.path.join(rootdir, "{}.json".format(i))) for i in range(n_shards)]
+    shard_statistics, elapsed = timed(collect)
+    print("{:<10} {:8.3f} s".format("shards", elapsed))
+
+    # Merge shards in order, and as a balanced tree of merges
+    merged, elapsed = timed(lambda : reduce(CorpusStatistics.merge, shard_statistics, CorpusStatistics()))
+    print("{:<10} {:8.3f} s".format("merge", elapsed))
+    def pairwise(statistics):
+        if len(statistics) == 1: return statistics[0]
+        middle = len(statistics) // 2
+        return CorpusStatistics().merge(pairwise(statistics[:middle])).merge(pairwise(statistics[middle:]))
+
+    # Merged statistics must equal statistics of all trees, in any grouping
+    canonical = lambda statistics : ({node : dict(counts) for node, counts in statistics.edge_counts.items()}, dict(statistics.adj_counts), dict(statistics.path_counts))
+    assert canonical(merged) == canonical(expected) == canonical(pairwise(shard_statistics))
+
+
+def random_statistics(n_nodes : int, n_neighbors : int = 8, seed : int = 0) -> CorpusStatistics:
+    """
+    Create random statistics of n_nodes distinct nodes, each with up to n_neighbors distinct children
+    """
+    rng = random.Random(seed)
+    names = ["Node{}".format(i) for i in range(n_nodes)]
+    statistics = CorpusStatistics()
+    for name in names:
+        statistics.edge_counts[name] = OrderedDict((child, tuple(sorted((rng.randint(0, 4), rng.randint(0, 4))))) for child in rng.sample(names, rng.randint(0, n_neighbors)))
+        statistics.adj_counts[name] = tuple(sorted((rng.randint(0, 16), rng.randint(0, 16))))
+        statistics.path_counts[name] = tuple(sorted((rng.randint(1, 8), rng.randint(1, 8))))
+    return statistics
+
+
+def benchmark_store(n_nodes : int = 50000, n_reads : int = 5):
+    """
+    Compare writing and reading edge counts and adjacent counts as text files and as a StatisticsStore, and reading the rows of a single node
+    (path_counts.py depends on enumerate_tree_paths, which is not defined in this tree, so path counts are only read from the store)
+    """
+
+    # Generate statistics
+    statistics = random_statistics(n_nodes)
+    rootdir = mkdtemp()
+
+    # Write and read text files
+    def write_text():
+        write_edge_counts(statistics.edge_counts, rootdir)
+        write_adjacent_counts(statistics.adj_counts, rootdir)
+    def read_text():
+        return read_edge_counts(rootdir), read_adjacent_counts(rootdir)
+    _, elapsed = timed(write_text)
+    print("{:<14} {:8.3f} s".format("text write", elapsed))
+    text, elapsed = timed(lambda : [read_text() for _ in range(n_reads)][-1])
+    print("{:<14} {:8.3f} s".format("text read", elapsed / n_reads))
+
+    # Write and read store
+    store = StatisticsStore(os.path.join(rootdir, "statistics.db"))
+    def write_store():
+        store.write_edge_counts(statistics.edge_counts)
+        store.write_adjacent_counts(statistics.adj_counts)
+    def read_store():
+        return store.read_edge_counts(), store.read_adjacent_counts()
+    _, elapsed = timed(write_store)
+    print("{:<14} {:8.3f} s".format("store write", elapsed))
+    store.write_path_counts(statistics.path_counts)
+    stored, elapsed = timed(lambda : [read_store() for _ in range(n_reads)][-1])
+    print("{:<14} {:8.3f} s".format("store read", elapsed / n_reads))
+
+    # Read the rows of single nodes
+    nodes = random.Random(1).sample(list(statistics.edge_counts), 1000)
+    single, elapsed = timed(lambda : [(store.read_edge_counts(node=node), store.read_adjacent_counts(node=node), store.read_path_counts(node=node)) for node in nodes])
+    print("{:<14} {:8.3f} ms".format("store node", elapsed / len(nodes) * 1000))
+
+    # Store keeps every table in order, including nodes without children, which the text file drops
+    assert list(stored[0].items()) == list(statistics.edge_counts.items())
+    assert list(text[0].items()) == [(node, counts) for node, counts in statistics.edge_counts.items() if counts]
+    assert list(stored[1].items()) == list(text[1].items()) == list(statistics.adj_counts.items())
+    assert list(store.read_path_counts().items()) == list(statistics.path_counts.items())
+    for node, (edge_counts, adj_counts, path_counts) in zip(nodes, single):
+        assert edge_counts == {node : statistics.edge_counts[node]}
+        assert adj_counts == {node : statistics.adj_counts[node]} and path_counts == {node : statistics.path_counts[node]}
+    store.close()
+
+    # Interned nodes are stored as their ids
+    symbols = SymbolTable()
+    interned = statistics.intern(symbols)
+    with StatisticsStore(os.path.join(rootdir, "interned.db")) as store:
+        store.write_edge_counts(interned.edge_counts, symbols)
+        assert store.read_edge_counts() == statistics.edge_counts
+        assert store.read_edge_counts(symbols) == interned.edge_counts
+
+
+def benchmark_node_classes(n_nodes : int = 50000, n_changed : int = 20, n_new : int = 5):
+    """
+    Compare recomputing and rewriting every node class with updating only the classes of nodes whose statistics changed
+    """
+
+    # Generate statistics, and statistics of a batch of new trees touching a few existing nodes and adding new ones
+    previous = random_statistics(n_nodes)
+    rng = random.Random(1)
+    batch = CorpusStatistics()
+    for node in rng.sample(list(previous.edge_counts), n_changed) + ["New{}".format(i) for i in range(n_new)]:
+        batch.edge_counts[node] = OrderedDict((child, (1, 1)) for child in rng.sample(list(previous.edge_counts), 2))
+        batch.adj_counts[node] = (2, 2)
+        batch.path_counts[node] = (1, 1)
+    for node in list(batch.edge_counts):
+        for child in batch.edge_counts[node]:
+            batch.edge_counts.setdefault(child, OrderedDict())
+            batch.adj_counts.setdefault(child, (0, 0))
+    statistics = random_statistics(n_nodes).merge(batch)
+
+    # Write node classes of previous statistics
+    rootdir = mkdtemp()
+    store = StatisticsStore(os.path.join(rootdir, "statistics.db"))
+    node_classes = get_node_classes(previous.edge_counts, previous.adj_counts)
+    store.write_node_classes(node_classes)
+
+    # Recompute and rewrite every class
+    def recompute():
+        node_classes = get_node_classes(statistics.edge_counts, statistics.adj_counts)
+        store.write_node_classes(node_classes)
+        return node_classes
+    _, elapsed = timed(recompute)
+    print("{:<14} {:8.3f} s".format("recompute", elapsed))
+    expected = store.read_node_classes()
+    store.write_node_classes(node_classes)
+
+    # Update only the classes of changed nodes
+    def update():
+        updated, changes = update_node_classes(store.read_node_classes(), statistics.edge_counts, statistics.adj_counts, statistics.diff(previous))
+        store.update_node_classes(changes)
+        return updated, changes
+    (updated, changes), elapsed = timed(update)
+    print("{:<14} {:8.3f} s".format("update", elapsed))
+    print("{} changed classes".format(len(changes)))
+
+    # Updated classes must equal recomputed classes, in the same order
+    assert updated == store.read_node_classes() == expected
+    store.close()
+
+
+def consolidate_recursive(nodes : list[NamedNode], node_name : str, ignore_nodes : list[str]) -> TreeNode:
+    """
+    Reference consolidation, grouping the children of all nodes by name and recursing once per group
+    """
+    new = TreeNode(node_name)
+    if node_name in ignore_nodes: return new
+    name_map = dict()
+    for node in nodes:
+        for child in node.children:
+            name_map.setdefault(child.name, []).append(child)
+    for child_name, children in name_map.items():
+        new.children.append(consolidate_recursive(children, child_name, ignore_nodes))
+    return new
+
+
+def tree_tuple(tree) -> tuple:
+    """
+    Nested (name, children) tuples of tree, built without recursion
+    """
+    stack = [(tree, False)]
+    results = list()
+    while stack:
+        curr, visited = stack.pop()
+        if visited:
+            n_children = len(curr.children)
+            children = tuple(results[len(results) - n_children:]) if n_children else ()
+            del results[len(results) - n_children:]
+            results.append((curr.name, children))
+        else:
+            stack.append((curr, True))
+            stack.extend((child, False) for child in reversed(curr.children))
+    return results[0]
+
+
+def benchmark_consolidate(n_trees : int = 200, n_nodes : int = 5000, depth : int = 20000):
+    """
+    Compare recursive consolidation of all trees at once with iterative consolidation of one tree at a time
+    """
+
+    # Generate trees
+    names = ["Expr", "Subtract", "Add", "Designator", "DataRef", "Name", "ValueStr"]
+    trees = [random_named_tree(n_nodes, names, seed=i) for i in range(n_trees)]
+
+    # Consolidate trees
+    for ignore_nodes in ([], ["Designator"]):
+        expected, elapsed = timed(consolidate_recursive, trees, "Program", ignore_nodes)
+        print("{:<14} {:8.3f} s".format("recursive", elapsed))
+        consolidated, elapsed = timed(consolidate, iter(trees), None, ignore_nodes)
+        print("{:<14} {:8.3f} s".format("iterative", elapsed))
+        assert tree_tuple(consolidated) == tree_tuple(expected)
+
+    # Consolidate trees generated one at a time, so only the current tree is alive
+    consolidated, elapsed = timed(consolidate, (random_named_tree(n_nodes, names, seed=i) for i in range(n_trees)))
+    print("{:<14} {:8.3f} s (including generation)".format("streaming", elapsed))
+    assert tree_tuple(consolidated) == tree_tuple(consolidate_recursive(trees, "Program", []))
+
+    # Consolidate a chain deeper than the recursion limit
+    chain = NamedNode("Program")
+    curr = chain
+    for i in range(depth):
+        curr.children.append(NamedNode(names[i % len(names)]))
+        curr = curr.children[0]
+    consolidated, elapsed = timed(consolidate, [chain, chain])
+    print("{:<14} {:8.3f} s (depth {})".format("deep", elapsed, depth))
+    try:
+        consolidate_recursive([chain], "Program", [])
+        print("recursive consolidation of depth {} succeeded".format(depth))
+    except RecursionError:
+        print("recursive consolidation of depth {} exceeds the recursion limit".format(depth))
+
+
+def benchmark_subtrees(n_nodes : int = 100000):
+    """
+    Time finding the consolidated subtree of each internal node, and count the distinct subpaths found
+    against the subpaths of every internal node (which the previous implementation materialized, with duplicates)
+    """
+
+    # Generate tree
+    names = ["Expr", "Subtract", "Add", "Designator", "DataRef", "Name", "ValueStr"]
+    tree = random_named_tree(n_nodes, names)
+
+    # Find subtrees and distinct subpaths
+    subtrees, elapsed = timed(find_subtrees, tree)
+    print("{:<14} {:8.3f} s ({} subtrees)".format("subtrees", elapsed, len(subtrees)))
+    subpaths, elapsed = timed(lambda : list(find_subpaths(tree)))
+    print("{:<14} {:8.3f} s ({} distinct subpaths)".format("subpaths", elapsed, len(subpaths)))
+
+    # Count subpaths of every internal node, shortened at cyclic nodes
+    cyclic_nodes = find_cyclic_nodes(tree)
+    n_subpaths = 0
+    stack = [(tree, True)]
+    while stack:
+        curr, is_root = stack.pop()
+        if curr.children: stack.extend((child, False) for child in curr.children)
+        if not is_root and (not curr.children or curr.name in cyclic_nodes): n_subpaths += 1
+    print("{} subpaths of every internal node".format(n_subpaths))
+
+
+def expr_chain_tree(n_stmts : int, depth : int, seed : int = 0) -> NamedNode:
+    """
+    Create a tree of assignment statements whose expressions are recursive chains of Expr nodes of the given depth,
+    each operator having a designator as its other operand
+    """
+
+    # Create designator
+    def designator() -> NamedNode:
+        node = NamedNode("Designator")
+        node.children.append(NamedNode("DataRef"))
+        node.children[0].children.append(NamedNode("Name"))
+        return node
+
+    # Create each statement
+    rng = random.Random(seed)
+    root = NamedNode("Program")
+    for i in range(n_stmts):
+        stmt, variable, expr = NamedNode("AssignmentStmt"), NamedNode("Variable"), NamedNode("Expr")
+        variable.children.append(designator())
+        stmt.children.extend([variable, expr])
+        root.children.append(stmt)
+
+        # Extend chain by one operator at a time
+        for _ in range(depth):
+            op = NamedNode(rng.choice(["Add", "Subtract", "Parentheses"]))
+            expr.children.append(op)
+            next = NamedNode("Expr")
+            op.children.append(next)
+            if op.name != "Parentheses":
+                other = NamedNode("Expr")
+                other.children.append(designator())
+                op.children.append(other)
+            expr = next
+        expr.children.append(designator())
+
+    return root
+
+
+def is_contained(tree : NamedNode, relocated : TreeNode) -> bool:
+    """
+    Check that every path of tree is a path of relocated tree, following the child with the same name at each node
+    """
+    stack = [(tree, relocated)]
+    while stack:
+        curr, curr_reloc = stack.pop()
+        children = {child.name : child for child in curr_reloc.children}
+        for child in curr.children:
+            if child.name not in children: return False
+            stack.append((child, children[child.name]))
+    return True
+
+
+def benchmark_partial_relocation(n_stmts : int = 200, depths : tuple = (10, 100, 1000), n_trees : int = 50, n_nodes : int = 5000):
+    """
+    Compare the size of the consolidated, partially relocated and relocated trees of corpora of recursive Expr chains of increasing depth,
+    then time each form on a random corpus, partially relocating it in one pass with its recursion given
+    """
+
+    # Size of each form of expression chains, for each depth
+    for depth in depths:
+        trees = [expr_chain_tree(n_stmts, depth, seed) for seed in range(4)]
+        partial = partially_relocate(trees)
+        assert all(is_contained(tree, partial) for tree in trees)
+        sizes = get_relocation_sizes(trees)
+        print("depth {:<6} ".format(depth) + "  ".join("{} {} nodes {} edges".format(name, *size) for name, size in sizes.items()))
+
+    # Time each form of random trees
+    names = ["Expr", "Subtract", "Add", "Designator", "DataRef", "Name", "ValueStr"]
+    trees = [random_named_tree(n_nodes, names, seed=i) for i in range(n_trees)]
+    recursion, elapsed = timed(lambda : get_recursion(get_relocated_graph(relocate(trees))))
+    print("{:<14} {:8.3f} s".format("recursion", elapsed))
+    for name, f in (("consolidated", lambda : consolidate(trees)), ("relocated", lambda : relocate(trees)), ("partial", lambda : partially_relocate(iter(trees), recursion))):
+        _, elapsed = timed(f)
+        print("{:<14} {:8.3f} s".format(name, elapsed))
+    assert all(is_contained(tree, partially_relocate(trees, recursion)) for tree in trees)
+
+    # Partially relocate a chain deeper than the recursion limit
+    chain = expr_chain_tree(1, 20000)
+    _, elapsed = timed(partially_relocate, [chain])
+    print("{:<14} {:8.3f} s (depth {})".format("deep", elapsed, 20000))
+
+
+if __name__ == "__main__":
+
+    # Run each benchmark named on the command line
+    for name in sys.argv[1:]:
+        globals()[name]()
@@ -0,0 +1,16 @@
+"""
+Stand-in for flang-new that replays a recorded parse tree dump
+Accepts the same arguments as 'flang-new -fc1 -fdebug-dump-parse-tree-no-sema <filepath>',
+but writes the contents of <filepath> (a recorded dump) to stdout instead of parsing it
+Usage: python flang_replay.py [flags] <filepath>
+"""
+import sys
+import shutil
+
+
+if __name__ == "__main__":
+
+    # Copy recorded dump to stdout in chunks, as flang-new writes its output
+    f = open(sys.argv[-1], 'rb')
+    shutil.copyfileobj(f, sys.stdout.buffer, 1 << 16)
+    f.close()
@@ -2,6 +2,7 @@ from exploratory.basic.trees import Tree
 from exploratory.basic.nodes import Node
 from exploratory.basic.parsers import StandardParser
 from exploratory.basic.structures import TreeStructure, StructureQueryTool
+from exploratory.basic.predicates import Count
 from exploratory.tools.files import get_files
 from collections import deque
 
@@ -68,15 +69,8 @@ def test5():
     paths = []
     paths.append(["Expr"])
     paths.append(["Expr", "Subtract", "Expr", "Subtract"])
-    d = deque()
-    for path in paths:
-        p = deque()
-        for id in path:
-            new = Node(id)
-            p.append(new)
-        d.append(p)
         
-    a = lambda X : X[0] > 0 and X[1] > 0
+    a = (Count(0) > 0) & (Count(1) > 0)
         
     structure = TreeStructure()
     for filepath in get_files("data", "txt")[:500]:
@@ -86,9 +80,9 @@ def test5():
     
     s = structure.restructure("Expr")
     sqt = StructureQueryTool(s)
-    q = sqt.query(d, a)
+    q = sqt.query(paths, a)
     print(q)
 
 if __name__ == "__main__":    
     
-    test5()
\ No newline at end of file
+    test5()